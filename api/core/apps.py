@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
 
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from core.dbpools import count_connect
+        from core.search import build_missing_index
+        from core.shards import sync_after_migrate
+        post_migrate.connect(build_missing_index, sender=self, dispatch_uid='core-build-search-index')
+        post_migrate.connect(sync_after_migrate, sender=self, dispatch_uid='core-sync-shard-shared-rows')
+        connection_created.connect(count_connect, dispatch_uid='core-count-database-connects')
@@ -0,0 +1,109 @@
+# core/authentication.py
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from core import shards
+
+
+class UserCache:
+    """
+    A small, thread-safe LRU of users with a time-to-live, indexed by user id so
+    every entry of a user can be dropped at once.
+    """
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict() # (user_id, token_id) -> (expires_at, user)
+        self._keys_by_user = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, user):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, user)
+            self._keys_by_user.setdefault(key[0], set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, user_id):
+        with self._lock:
+            for key in list(self._keys_by_user.get(str(user_id), ())):
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def _remove(self, key):
+        self._entries.pop(key, None)
+        keys = self._keys_by_user.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[key[0]]
+
+
+user_cache = UserCache(settings.AUTH_USER_CACHE_SIZE, settings.AUTH_USER_CACHE_TTL)
+
+
+def invalidate_user(user_id):
+    """Forgets the cached user in this process (called when a User is saved or deleted)."""
+    user_cache.invalidate(user_id)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    simplejwt's JWTAuthentication, with the user (and its school) kept in a per-process
+    cache keyed by user id and token id.
+
+    A hit costs no query, and `request.user.school` is already loaded. Saving or deleting
+    a User drops its entries in the process that did it; other processes see the
+    change within AUTH_USER_CACHE_TTL seconds. Each request gets its own copy of the user,
+    and its school data is routed to the user's school (core.shards).
+    """
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        key = (str(user_id), validated_token.get(api_settings.JTI_CLAIM))
+        user = user_cache.get(key)
+        if user is None:
+            # The token names the school, so the user is read from its database directly;
+            # tokens issued before the claim existed are looked up on every database.
+            shards.activate(validated_token.get(shards.SCHOOL_CLAIM))
+            user = shards.find(self.user_model.objects.select_related('school'), **{api_settings.USER_ID_FIELD: user_id})
+            if user is None:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            user_cache.set(key, user)
+        shards.activate(user.school_id)
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return copy.copy(user)
@@ -0,0 +1,64 @@
+# core/dbpools.py
+
+"""
+How this process uses its database connections, for sizing DATABASE_CONN_MAX_AGE
+and the psycopg pools (DATABASE_POOL) against measured demand.
+
+Every connect is counted per database: with persistent connections each one is a
+new connection, with a pool each one is a checkout. Pools also report psycopg's
+own figures (size, idle connections, requests waiting and time spent waiting).
+Figures belong to the worker process that answers, so poll a few times to cover
+every worker.
+"""
+
+import os
+import threading
+import time
+from collections import Counter
+
+from django.db import connections
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+_started = time.monotonic()
+_connects = Counter() # database alias -> connects in this process
+_lock = threading.Lock()
+
+
+def count_connect(sender, connection, **kwargs):
+    """connection_created: counts a connect on `connection`'s database."""
+    with _lock:
+        _connects[connection.alias] += 1
+
+
+def database_status(alias):
+    connection = connections[alias]
+    settings_dict = connection.settings_dict
+    pooled = bool(settings_dict['OPTIONS'].get('pool'))
+    return {
+        'alias': alias,
+        'vendor': connection.vendor,
+        'conn_max_age': settings_dict['CONN_MAX_AGE'],
+        'health_checks': settings_dict['CONN_HEALTH_CHECKS'],
+        'connects': _connects[alias],
+        # The pool is created (not opened) on first use; psycopg_pool.ConnectionPool.get_stats().
+        'pool': connection.pool.get_stats() if pooled else None,
+    }
+
+
+def status():
+    """Connection figures of this process for every configured database."""
+    return {
+        'pid': os.getpid(),
+        'uptime_seconds': round(time.monotonic() - _started),
+        'databases': [database_status(alias) for alias in connections],
+    }
+
+
+class DatabaseStatusView(APIView):
+    """GET: how this worker process uses its database connections (admins only)."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(status())
@@ -0,0 +1,28 @@
+# core/filters.py
+
+from django.conf import settings
+from rest_framework.filters import SearchFilter
+from rest_framework.settings import api_settings
+
+from core import search
+
+
+class IndexedSearchFilter(SearchFilter):
+    """
+    SearchFilter served by the search index (core.search) for models registered with
+    exactly the view's `search_fields`. Results are ordered by relevance unless an
+    ordering is requested. Other models, and SEARCH_INDEX_ENABLED=False, fall back
+    to SearchFilter's `icontains` predicates.
+    """
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        spec = search.get_spec(queryset.model)
+        if (
+            not terms
+            or not settings.SEARCH_INDEX_ENABLED
+            or spec is None
+            or set(spec.fields) != set(self.get_search_fields(view, request) or ())
+        ):
+            return super().filter_queryset(request, queryset, view)
+
+        return search.search(queryset, terms, rank=not request.query_params.get(api_settings.ORDERING_PARAM))
@@ -0,0 +1,116 @@
+# core/images.py
+
+"""
+Image encoding helpers.
+
+Everything here takes and returns bytes and has no Django dependencies, so it can
+run inside a worker process (see core.workers) as well as inline.
+"""
+
+from io import BytesIO
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# Responsive variants, by the length of their longest edge in pixels.
+VARIANT_SIZES = {
+    'full': 1280,
+    'card': 480,
+    'thumbnail': 160,
+}
+
+# Output formats: extension -> (PIL format, encoder options).
+FORMATS = {
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+}
+
+
+class ImageRejected(ValueError):
+    """An upload that will not be decoded. The message is safe to show to the user."""
+
+
+def probe(fileobj, max_pixels, max_edge):
+    """
+    Reads only the image header and checks the dimensions against the limits, so
+    oversized images are refused before a single pixel is decoded.
+    Returns (format, width, height) and leaves the file position unchanged.
+    """
+    position = fileobj.tell()
+    try:
+        with Image.open(fileobj) as img:
+            fmt, (width, height) = img.format, img.size
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+        raise ImageRejected("Upload a valid image. The file is either not an image or corrupted.")
+    finally:
+        fileobj.seek(position)
+    if width > max_edge or height > max_edge:
+        raise ImageRejected(f"The image is {width}x{height} pixels; each side must be at most {max_edge} pixels.")
+    if width * height > max_pixels:
+        raise ImageRejected(
+            f"The image has {width * height / 1e6:.1f} megapixels; the limit is {max_pixels / 1e6:.1f}."
+        )
+    return fmt, width, height
+
+
+def open_scaled(fileobj, max_edge):
+    """
+    Opens an image decoded at the smallest size that still covers `max_edge`.
+
+    JPEGs use draft mode, which lets the decoder itself scale by 1/2, 1/4 or 1/8, so
+    a 50 MP photo never exists at full resolution in memory. Other formats are
+    shrunk by an integer factor with reduce() straight after decoding.
+    """
+    img = Image.open(fileobj)
+    width, height = img.size
+    ratio = max_edge / max(width, height)
+    if ratio < 1 and img.format == 'JPEG':
+        img.draft('RGB', (max(1, int(width * ratio)), max(1, int(height * ratio))))
+    img.load()
+    factor = int(max(img.size) / max_edge)
+    if factor >= 2:
+        img = img.reduce(factor)
+    return img
+
+
+def _to_rgb(img):
+    """Applies the EXIF orientation and flattens any transparency onto white."""
+    ImageOps.exif_transpose(img, in_place=True)
+    if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
+        img = img.convert('RGBA')
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        background.paste(img, mask=img.getchannel('A'))
+        return background
+    return img.convert('RGB') if img.mode != 'RGB' else img
+
+
+def encode(img, fmt):
+    pil_format, options = FORMATS[fmt]
+    buffer = BytesIO()
+    img.save(buffer, format=pil_format, **options)
+    return buffer.getvalue()
+
+
+def render_variants(data, sizes=VARIANT_SIZES):
+    """
+    Decodes an image once and renders every variant in every format.
+
+    Returns {variant: {'width', 'height', <ext>: bytes, ...}}. The source is decoded
+    only as large as the biggest variant needs (see open_scaled), then variants are
+    produced largest first, each one downscaled from the previous, and never upscaled.
+    """
+    img = _to_rgb(open_scaled(BytesIO(data), max(sizes.values())))
+    variants = {}
+    for name, edge in sorted(sizes.items(), key=lambda item: -item[1]):
+        img.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+        variant = {'width': img.width, 'height': img.height}
+        for fmt in FORMATS:
+            variant[fmt] = encode(img, fmt)
+        variants[name] = variant
+    return variants
+
+
+def downscale(fileobj, max_edge, fmt='jpeg'):
+    """Re-encodes an image with its longest edge capped at `max_edge`, decoding it scaled."""
+    img = _to_rgb(open_scaled(fileobj, max_edge))
+    img.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+    return encode(img, fmt)
@@ -0,0 +1,70 @@
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from io import BytesIO
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from core import images
+
+
+def legacy_ingest(data):
+    """The previous StoreItem.save path: full-resolution decode, RGB convert, JPEG re-encode."""
+    img = Image.open(BytesIO(data))
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    buffer = BytesIO()
+    img.save(buffer, format='JPEG', quality=85, optimize=True)
+    return buffer.getvalue()
+
+
+STRATEGIES = {
+    'legacy': legacy_ingest,
+    'store-variants': images.render_variants,
+    'report-card': lambda data: images.downscale(BytesIO(data), settings.REPORT_CARD_MAX_EDGE),
+}
+
+
+def _make_sample(path, fmt, megapixels):
+    width = int((megapixels * 1e6 * 4 / 3) ** 0.5)
+    height = int(width * 3 / 4)
+    gradient = Image.linear_gradient('L').resize((width, height))
+    Image.merge('RGB', (gradient, gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT), gradient)).save(path, format=fmt)
+
+
+def _measure(strategy, path, report_card_max_edge):
+    """Runs in a fresh process: returns (peak RSS growth in KiB, seconds) for one ingestion."""
+    settings.configure(REPORT_CARD_MAX_EDGE=report_card_max_edge)
+    with open(path, 'rb') as source:
+        data = source.read()
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    STRATEGIES[strategy](data)
+    elapsed = time.perf_counter() - started
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline, elapsed
+
+
+class Command(BaseCommand):
+    help = 'Report the peak memory and time of one image upload through each ingestion path.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--megapixels', type=float, default=50, help='Size of the sample image (default: 50).')
+        parser.add_argument('--formats', default='jpeg,png', help='Sample formats, comma-separated (default: jpeg,png).')
+
+    def handle(self, *args, **options):
+        # Every measurement runs in its own process so peak RSS is not shared between them.
+        context = multiprocessing.get_context('spawn')
+        with tempfile.TemporaryDirectory() as directory:
+            for fmt in options['formats'].split(','):
+                path = os.path.join(directory, f'sample.{fmt}')
+                with context.Pool(1) as pool:
+                    pool.apply(_make_sample, (path, fmt.upper(), options['megapixels']))
+                self.stdout.write(f"{fmt.upper()} sample, {options['megapixels']:g} MP, {os.path.getsize(path) / 1e6:.1f} MB:")
+                for strategy in STRATEGIES:
+                    with context.Pool(1) as pool:
+                        peak, elapsed = pool.apply(_measure, (strategy, path, settings.REPORT_CARD_MAX_EDGE))
+                    self.stdout.write(f'  {strategy:<15} peak +{peak / 1024:7.1f} MiB  {elapsed * 1000:7.0f} ms')
@@ -0,0 +1,85 @@
+import json
+import timeit
+from collections import OrderedDict
+
+from django.core.management.base import BaseCommand
+from drf_camel_case.render import CamelCaseJSONRenderer
+from rest_framework.response import Response
+
+from core.renderers import CustomJSONRenderer
+
+
+class LegacyRenderer(CamelCaseJSONRenderer):
+    """The previous renderer: drf_camel_case's camelize + stdlib json, with the same wrapping."""
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        response = renderer_context.get('response')
+        if response and 200 <= response.status_code < 300 and data and 'success' not in data:
+            data = {'success': True, 'data': data}
+        return super().render(data, accepted_media_type, renderer_context)
+
+
+def _user(i):
+    return OrderedDict([
+        ('id', i), ('username', f'student_{i}'), ('full_name', f'Student Number {i}'),
+        ('email', f'student{i}@example.com'), ('phone_number', '0911000000'), ('role', 'STUDENT'),
+        ('last_login', '2025-09-01T08:00:00Z'), ('date_joined', '2025-07-01T08:00:00Z'),
+    ])
+
+
+def _paginated(items):
+    return {
+        'success': True,
+        'data': {
+            'items': items,
+            'pagination': {'next_page': None, 'previous_page': None, 'count': len(items), 'total_pages': 1, 'current_page': 1},
+        },
+    }
+
+
+def leaderboard_payload(size):
+    return _paginated([
+        OrderedDict([('user', _user(i)), ('total_xp', 10_000 - i), ('available_xp', 500), ('report_card', None), ('rank', i + 1)])
+        for i in range(size)
+    ])
+
+
+def transactions_payload(size):
+    item = OrderedDict([
+        ('id', 1), ('name', 'Sticker Pack'), ('description', 'A pack of developer stickers.'), ('xp_cost', 100),
+        ('image_url', 'http://localhost/uploads/storeitem/a.jpg'), ('stock_quantity', 25), ('is_active', True),
+        ('created_at', '2025-07-01T08:00:00Z'),
+    ])
+    return _paginated([
+        OrderedDict([('id', i), ('student', _user(i)), ('item', item), ('xp_cost_at_purchase', 100), ('timestamp', '2025-09-01T08:00:00Z')])
+        for i in range(size)
+    ])
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the orjson renderer against the previous drf_camel_case renderer on typical list payloads.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=100, help='Rows per payload (default: 100).')
+        parser.add_argument('--number', type=int, default=200, help='Renders per measurement (default: 200).')
+
+    def handle(self, *args, **options):
+        context = {'response': Response(status=200)}
+        legacy, current = LegacyRenderer(), CustomJSONRenderer()
+        payloads = {
+            'leaderboard': leaderboard_payload(options['size']),
+            'transactions': transactions_payload(options['size']),
+        }
+        for name, payload in payloads.items():
+            before = legacy.render(payload, renderer_context=context)
+            after = current.render(payload, renderer_context=context)
+            if json.loads(before) != json.loads(after):
+                self.stderr.write(self.style.ERROR(f'{name}: renderer output differs!'))
+                continue
+            legacy_time = min(timeit.repeat(lambda: legacy.render(payload, renderer_context=context), number=options['number'], repeat=3))
+            current_time = min(timeit.repeat(lambda: current.render(payload, renderer_context=context), number=options['number'], repeat=3))
+            per_call = lambda seconds: seconds / options['number'] * 1000
+            self.stdout.write(
+                f"{name} ({options['size']} rows, {len(after)} bytes): "
+                f"drf_camel_case {per_call(legacy_time):.3f} ms, orjson {per_call(current_time):.3f} ms "
+                f"({legacy_time / current_time:.1f}x faster)"
+            )
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from rest_framework.test import APIClient
+
+from core import queryplans
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a throwaway test database, request each hot list endpoint and print the plan '
+        'of its list query. Fails if any of them needs a sequential scan or a sort. '
+        '`manage.py test core.tests.test_query_plans` runs the same checks.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schools', type=int, default=3)
+        parser.add_argument('--students', type=int, default=200, help='Students per school (default: 200).')
+        parser.add_argument('--rows', type=int, default=5000, help='XP log and transaction rows (default: 5000 each).')
+
+    def handle(self, *args, **options):
+        if not queryplans.supported():
+            raise CommandError(f'Query plans can only be checked on SQLite or PostgreSQL, not {connection.vendor}.')
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            # Only the primary has a throwaway copy: keep every school (and id), and every read, on it.
+            with override_settings(DATABASE_SHARD_URLS=[], DATABASE_ROUTERS=[]):
+                failures = self.check_plans(options)
+        except queryplans.PlanCheckError as e:
+            raise CommandError(str(e))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        if failures:
+            raise CommandError(f"{len(failures)} query plan(s) degraded: {', '.join(failures)}.")
+        self.stdout.write(self.style.SUCCESS(f'All {len(queryplans.CASES)} list queries are served by indexes.'))
+
+    def check_plans(self, options):
+        teacher, student = queryplans.seed(options['schools'], options['students'], options['rows'])
+        client = APIClient()
+        client.force_authenticate(teacher)
+        failures = []
+        for name, url, table in queryplans.CASES:
+            problems = []
+            for sql, details, found in queryplans.list_query_plans(client, url.format(student=student.pk), table):
+                problems.extend(found)
+                if options['verbosity'] > 1 or found:
+                    self.stdout.write(f'  {sql}')
+                    for detail in details:
+                        self.stdout.write(f'    {detail}')
+            if problems:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f"FAIL {name}: {', '.join(sorted(set(problems)))}"))
+            else:
+                self.stdout.write(f'ok   {name}')
+        return failures
@@ -0,0 +1,34 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import spa
+
+
+class Command(BaseCommand):
+    help = 'Write .br/.gz siblings for the static build (run after `vite build` or collectstatic).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Recompress files whose siblings look up to date.')
+
+    def handle(self, *args, **options):
+        roots = [str(settings.STATIC_ROOT)] if settings.STATIC_ROOT and os.path.isdir(settings.STATIC_ROOT) else []
+        roots += [str(root) for root in settings.STATICFILES_DIRS if os.path.isdir(root)]
+        if spa.brotli is None:
+            self.stdout.write(self.style.WARNING('brotli is not installed; only .gz files will be written.'))
+
+        written = skipped = 0
+        for root in roots:
+            for directory, _, filenames in os.walk(root):
+                for filename in filenames:
+                    if not filename.endswith(spa.COMPRESSIBLE_EXTENSIONS):
+                        continue
+                    full_path = os.path.join(directory, filename)
+                    if os.path.getsize(full_path) < spa.COMPRESS_MIN_SIZE:
+                        skipped += 1
+                        continue
+                    written += len(spa.compress_file(full_path, force=options['force']))
+        self.stdout.write(self.style.SUCCESS(
+            f"{written} compressed file(s) written under {', '.join(roots) or 'no static directory'}; {skipped} too small to compress."
+        ))
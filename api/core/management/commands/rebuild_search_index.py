@@ -0,0 +1,27 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from core import search, shards
+
+
+class Command(BaseCommand):
+    help = 'Bring the search index (core.search) up to date for one or all indexed models.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', help='Only rebuild this model, e.g. students.XpGrantLog.')
+
+    def handle(self, *args, **options):
+        models = search.registered_models()
+        if options['model']:
+            try:
+                model = apps.get_model(options['model'])
+            except (LookupError, ValueError):
+                raise CommandError(f"Unknown model {options['model']!r}.")
+            if search.get_spec(model) is None:
+                raise CommandError(f'{model._meta.label} is not indexed for search.')
+            models = [model]
+        for model in models:
+            for database in shards.databases_of(model):
+                written, removed = search.rebuild(model, using=database)
+                self.stdout.write(f'{model._meta.label} on {database}: {written} document(s) written, {removed} removed.')
+        self.stdout.write(self.style.SUCCESS('The search index is up to date.'))
@@ -0,0 +1,46 @@
+from django.apps import apps
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import models
+
+from core.storage import ContentAddressedStorage
+from core.versioning import bump_catalog, bump_school
+from users.models import School
+
+
+class Command(BaseCommand):
+    help = 'Move files uploaded before content addressing to hashed, sharded names (deduplicating them).'
+
+    def handle(self, *args, **options):
+        if not isinstance(default_storage, ContentAddressedStorage):
+            raise CommandError('The default storage is not core.storage.ContentAddressedStorage.')
+
+        moved = missing = 0
+        for model in apps.get_models():
+            for field in model._meta.get_fields():
+                if not isinstance(field, models.FileField):
+                    continue
+                rows = model._default_manager.exclude(**{field.name: ''}).exclude(**{f'{field.name}__isnull': True})
+                for pk, name in rows.values_list('pk', field.name).iterator():
+                    if default_storage.is_hashed_name(name):
+                        continue
+                    if not default_storage.exists(name):
+                        missing += 1
+                        self.stderr.write(f'{model._meta.label}#{pk} {field.name}: {name} is missing, skipped.')
+                        continue
+                    with default_storage.open(name, 'rb') as source:
+                        new_name = default_storage.save(name, source)
+                    # update() keeps save() side effects (e.g. image re-processing) out of this.
+                    model._default_manager.filter(pk=pk, **{field.name: name}).update(**{field.name: new_name})
+                    default_storage.delete(name) # Untracked, so removed right away
+                    moved += 1
+
+        if moved:
+            # URLs in cached responses and ETags changed.
+            bump_catalog()
+            for school_id in School.objects.values_list('pk', flat=True):
+                bump_school(school_id)
+        self.stdout.write(self.style.SUCCESS(
+            f'{moved} file(s) moved to content-addressed names, {missing} missing. '
+            'Run `process_store_images --all` to re-store existing image variants.'
+        ))
@@ -0,0 +1,33 @@
+import sqlite3
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from dev_xp_camp.routers import replica_aliases
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy the default SQLite database over every SQLite replica in DATABASE_REPLICA_URLS. '
+        'Stands in for replication when trying read replicas locally.'
+    )
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != 'sqlite':
+            raise CommandError('The default database is not SQLite; replicate it with the database server instead.')
+        aliases = [alias for alias in replica_aliases() if connections[alias].vendor == 'sqlite']
+        if not aliases:
+            raise CommandError('No SQLite replicas are configured (set DATABASE_REPLICA_URLS).')
+
+        primary.ensure_connection()
+        for alias in aliases:
+            connections[alias].close()
+            target = sqlite3.connect(connections[alias].settings_dict['NAME'])
+            try:
+                # The online backup API copies a consistent snapshot, even while the primary is in use.
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(f'{alias}: copied from {DEFAULT_DB_ALIAS}.')
+        self.stdout.write(self.style.SUCCESS('Replicas are up to date.'))
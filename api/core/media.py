@@ -0,0 +1,195 @@
+# core/media.py
+
+"""
+File responses for uploads (and other files on disk) that do not tie up a worker.
+
+`serve_file()` answers conditional requests (If-None-Match / If-Modified-Since) and
+single byte ranges (Range / If-Range) from a stat() call, then either hands the
+transfer off to the front proxy (`X-Accel-Redirect` for nginx, `X-Sendfile` for
+Apache/lighttpd) or streams the file itself. When streaming, the open file, limited
+to the requested range, is passed to the server's `wsgi.file_wrapper`, which lets
+servers such as gunicorn send it with zero-copy `os.sendfile()`.
+"""
+
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+SERVE_MODES = ('django', 'x-accel-redirect', 'x-sendfile')
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'public, no-cache'
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+class RangeFile:
+    """
+    A read-only window of `length` bytes starting at `start` in an open file.
+    It keeps `fileno()`, so servers that sendfile() from the current offset for
+    Content-Length bytes (e.g. gunicorn) still send exactly the range.
+    """
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        size = self.remaining if size is None or size < 0 else min(size, self.remaining)
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def tell(self):
+        return self.file.tell()
+
+    def seekable(self):
+        return False
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+    Parses a single `bytes=` range into an inclusive (start, end). Returns None when
+    the header should be ignored (absent, malformed or multi-range, which get the
+    whole file) and raises RangeNotSatisfiable when it lies beyond the file.
+    """
+    match = _RANGE_RE.match(header.strip()) if header else None
+    if not match or match.group(1) == match.group(2) == '':
+        return None
+    first, last = match.groups()
+    if first == '':
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            raise RangeNotSatisfiable
+        return max(0, size - suffix), size - 1
+    start = int(first)
+    end = size - 1 if last == '' else min(int(last), size - 1)
+    if last != '' and int(last) < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable
+    return start, end
+
+
+def _if_range_matches(request, etag, last_modified):
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        # Only a strong, exactly matching validator keeps the range.
+        return if_range.strip() == etag and not etag.startswith('W/')
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def serve_file(request, full_path, *, content_type=None, etag=None, immutable=False,
+               accel_path=None, mode='django', headers=None):
+    """
+    Serves the file at `full_path`.
+
+    `etag` defaults to one built from the size and modification time; `immutable`
+    marks files whose name changes with their content. In 'x-accel-redirect' mode,
+    `accel_path` is the internal URI nginx should serve.
+    """
+    if mode not in SERVE_MODES:
+        raise ImproperlyConfigured(f"Unknown file serving mode {mode!r}; use one of {', '.join(SERVE_MODES)}.")
+    try:
+        stat = os.stat(full_path)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404("File not found.")
+    if not os.path.isfile(full_path):
+        raise Http404("File not found.")
+
+    size = stat.st_size
+    last_modified = int(stat.st_mtime)
+    etag = etag or f'"{stat.st_mtime_ns:x}-{size:x}"'
+    if content_type is None:
+        content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+
+    base_headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(last_modified),
+        'Cache-Control': IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL,
+        'Accept-Ranges': 'bytes',
+        **(headers or {}),
+    }
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        for name, value in base_headers.items():
+            not_modified.headers.setdefault(name, value)
+        return not_modified
+
+    if mode == 'x-accel-redirect':
+        response = HttpResponse(content_type=content_type, headers=base_headers)
+        response['X-Accel-Redirect'] = quote(accel_path)
+        return response
+    if mode == 'x-sendfile':
+        response = HttpResponse(content_type=content_type, headers=base_headers)
+        response['X-Sendfile'] = full_path
+        return response
+
+    try:
+        byte_range = parse_range(request.META.get('HTTP_RANGE'), size) if _if_range_matches(request, etag, last_modified) else None
+    except RangeNotSatisfiable:
+        response = HttpResponse(status=416, headers=base_headers)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    start, end = byte_range or (0, size - 1)
+    length = end - start + 1 if size else 0
+    if request.method == 'HEAD':
+        response = HttpResponse(content_type=content_type, headers=base_headers)
+    else:
+        response = FileResponse(RangeFile(open(full_path, 'rb'), start, length), content_type=content_type, headers=base_headers)
+    response['Content-Length'] = str(length)
+    if byte_range:
+        response.status_code = 206
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Serves an upload from MEDIA_ROOT according to MEDIA_SERVE_MODE. Content-addressed
+    names (core.storage) never change content, so they are cached as immutable and
+    use their hash as a strong ETag.
+    """
+    path = posixpath.normpath(path).lstrip('/')
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("File not found.")
+
+    is_hashed = getattr(default_storage, 'is_hashed_name', None)
+    immutable = bool(is_hashed and is_hashed(path))
+    etag = f'"{os.path.splitext(posixpath.basename(path))[0]}"' if immutable else None
+    return serve_file(
+        request, full_path,
+        etag=etag,
+        immutable=immutable,
+        accel_path=settings.MEDIA_ACCEL_REDIRECT_PREFIX.rstrip('/') + '/' + path,
+        mode=settings.MEDIA_SERVE_MODE,
+    )
@@ -0,0 +1,79 @@
+# Generated by Django 5.2.4 on 2026-10-17 21:15
+
+from django.db import OperationalError, migrations, models
+
+FTS_TABLE = 'core_searchdocument_fts'
+
+SQLITE_FORWARD = [
+    # External-content FTS5 table over `body`, tokenized into trigrams so any substring
+    # of three or more characters is an index lookup, kept in sync by triggers.
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(body, content='core_searchdocument', content_rowid='id', tokenize='trigram')",
+    f"""CREATE TRIGGER core_searchdocument_fts_ai AFTER INSERT ON core_searchdocument BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, body) VALUES (new.id, new.body);
+    END""",
+    f"""CREATE TRIGGER core_searchdocument_fts_ad AFTER DELETE ON core_searchdocument BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, body) VALUES ('delete', old.id, old.body);
+    END""",
+    f"""CREATE TRIGGER core_searchdocument_fts_au AFTER UPDATE ON core_searchdocument BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, body) VALUES ('delete', old.id, old.body);
+        INSERT INTO {FTS_TABLE}(rowid, body) VALUES (new.id, new.body);
+    END""",
+]
+SQLITE_REVERSE = [
+    'DROP TRIGGER IF EXISTS core_searchdocument_fts_au',
+    'DROP TRIGGER IF EXISTS core_searchdocument_fts_ad',
+    'DROP TRIGGER IF EXISTS core_searchdocument_fts_ai',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+POSTGRESQL_FORWARD = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX core_searchdocument_body_trgm ON core_searchdocument USING gin (body gin_trgm_ops)',
+]
+POSTGRESQL_REVERSE = [
+    'DROP INDEX IF EXISTS core_searchdocument_body_trgm',
+]
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        for sql in POSTGRESQL_FORWARD:
+            schema_editor.execute(sql)
+    elif vendor == 'sqlite':
+        try:
+            schema_editor.execute(SQLITE_FORWARD[0])
+        except OperationalError:
+            return # SQLite built without FTS5: core.search falls back to LIKE
+        for sql in SQLITE_FORWARD[1:]:
+            schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for sql in {'postgresql': POSTGRESQL_REVERSE, 'sqlite': SQLITE_REVERSE}.get(vendor, ()):
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_storedfile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=100)),
+                ('object_id', models.BigIntegerField()),
+                ('body', models.TextField()),
+            ],
+            options={
+                'verbose_name': 'Search Document',
+                'verbose_name_plural': 'Search Documents',
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='core_searchdocument_object_uniq')],
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
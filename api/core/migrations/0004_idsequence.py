@@ -0,0 +1,25 @@
+# Generated by Django 5.2.4 on 2026-10-17 21:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_searchdocument'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('next_id', models.PositiveBigIntegerField()),
+            ],
+            options={
+                'verbose_name': 'Id Sequence',
+                'verbose_name_plural': 'Id Sequences',
+            },
+        ),
+    ]
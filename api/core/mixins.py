@@ -0,0 +1,210 @@
+# core/mixins.py
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import parse_etags
+from drf_camel_case.util import camel_to_underscore
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.serializers import BaseSerializer, ListSerializer
+
+from core.serializers import selection_subtree
+from core.versioning import current_versions, scope_keys
+
+
+def parse_fieldset(value):
+    """
+    Parses a `?fields=` / `?exclude=` value such as `totalXp,user.fullName` into a
+    selection tree: {'total_xp': None, 'user': {'full_name': None}}, where None means
+    "the whole field". Returns None when the parameter is absent or empty.
+    """
+    if not value:
+        return None
+    tree = {}
+    for path in value.split(','):
+        parts = [camel_to_underscore(part.strip()) for part in path.split('.') if part.strip()]
+        node = tree
+        for position, part in enumerate(parts):
+            if position == len(parts) - 1:
+                node[part] = None
+            elif node.get(part, {}) is None:
+                break # The whole field is already selected
+            else:
+                node = node.setdefault(part, {})
+    return tree or None
+
+
+def prune_serializer(serializer, only=None, exclude=None):
+    """Removes unselected fields from a (possibly nested) serializer instance, in place."""
+    if isinstance(serializer, ListSerializer):
+        serializer = serializer.child
+    fields = serializer.fields
+    for name in list(fields):
+        if (only is not None and name not in only) or (exclude and name in exclude and exclude[name] is None):
+            fields.pop(name)
+            continue
+        child = fields[name]
+        if isinstance(child, BaseSerializer) and (selection_subtree(only, name) or selection_subtree(exclude, name)):
+            prune_serializer(child, selection_subtree(only, name), selection_subtree(exclude, name))
+
+
+class SparseFieldsetMixin:
+    """
+    Lets read requests choose their fields with `?fields=` and `?exclude=`
+    (comma-separated, camelCase, dotted for nested objects, e.g. `?fields=totalXp,user.fullName`).
+
+    The selection trims the serializer output and is pushed down into the queryset:
+    list responses served through RowListMixin fetch only the selected columns, and
+    other reads get the matching `.only()` restriction.
+    """
+    fields_query_param = 'fields'
+    exclude_query_param = 'exclude'
+
+    def get_sparse_fieldsets(self):
+        if not hasattr(self, '_sparse_fieldsets'):
+            params = self.request.query_params if self.request.method in ('GET', 'HEAD') else {}
+            self._sparse_fieldsets = (
+                parse_fieldset(params.get(self.fields_query_param)),
+                parse_fieldset(params.get(self.exclude_query_param)),
+            )
+        return self._sparse_fieldsets
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        only, exclude = self.get_sparse_fieldsets()
+        if only is not None or exclude:
+            prune_serializer(serializer, only, exclude)
+        return serializer
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        only, exclude = self.get_sparse_fieldsets()
+        row_serializer_class = getattr(self, 'row_serializer_class', None)
+        if (only is not None or exclude) and row_serializer_class is not None and getattr(self, 'action', None) != 'list':
+            columns = row_serializer_class.lookups('', only, exclude)
+            # Relations that are select_related must stay loaded to be traversed.
+            related = queryset.query.select_related
+            if isinstance(related, dict):
+                columns += [f'{name}__id' for name in related]
+            queryset = queryset.only(*columns)
+        return queryset
+
+
+class RowListMixin:
+    """
+    Serves the `list` action from a `values()` projection serialized by a RowSerializer.
+
+    Only the columns the response needs are fetched, no model instances are built,
+    and the JSON is identical to what `serializer_class` would produce. Other actions
+    keep using the regular serializer.
+    """
+    row_serializer_class = None
+
+    def get_row_fieldsets(self):
+        if isinstance(self, SparseFieldsetMixin):
+            return self.get_sparse_fieldsets()
+        return None, None
+
+    def get_row_serializer(self, rows):
+        only, exclude = self.get_row_fieldsets()
+        return self.row_serializer_class(
+            rows, many=True, context=self.get_serializer_context(), only=only, exclude=exclude
+        )
+
+    def list(self, request, *args, **kwargs):
+        only, exclude = self.get_row_fieldsets()
+        columns = self.row_serializer_class.lookups('', only, exclude)
+        # Keyset pagination seeks on its ordering columns, so they are always fetched.
+        columns += [field.lstrip('-') for field in getattr(self, 'keyset_ordering', ()) if field.lstrip('-') not in columns]
+        queryset = self.filter_queryset(self.get_queryset()).values(*columns)
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.get_row_serializer(page).data)
+        return Response(self.get_row_serializer(queryset).data)
+
+
+class ConditionalGetMixin:
+    """
+    Answers list/retrieve requests with ETags derived from version stamps.
+
+    `etag_scopes` names the data a view depends on ('catalog', 'school'). The ETag is a
+    hash of those stamps plus everything else that shapes the response (the user, the
+    full path and the Accept header), so it costs one indexed query. A matching
+    `If-None-Match` gets a 304 before any querying or serialization happens.
+    """
+    etag_scopes = ()
+
+    def get_etag(self, request):
+        keys = scope_keys(self.etag_scopes, request.user)
+        versions = current_versions(request, keys)
+        user = request.user
+        parts = [
+            *(f'{key}={versions[key]}' for key in keys),
+            str(getattr(user, 'pk', None)),
+            str(getattr(user, 'role', None)),
+            request.get_host(),
+            request.get_full_path(),
+            request.META.get('HTTP_ACCEPT', ''),
+        ]
+        return 'W/"%s"' % hashlib.sha1('|'.join(parts).encode()).hexdigest()
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        if not self.etag_scopes:
+            return handler(request, *args, **kwargs)
+        etag = self.get_etag(request)
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match and (if_none_match.strip() == '*' or etag in parse_etags(if_none_match)):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response['ETag'] = etag
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request, *args, **kwargs)
+
+
+class VersionedListCacheMixin:
+    """
+    Caches the `list` response data in Django's cache under a key that embeds the
+    current version stamps of `list_cache_scopes`.
+
+    Bumping a stamp makes every older entry unreachable, so nothing has to be deleted
+    and the cache works the same with the local-memory, file or any shared backend.
+    Views add to the key with `get_list_cache_variant()` (e.g. the user's role).
+    """
+    list_cache_scopes = ()
+    list_cache_prefix = 'list'
+
+    def get_list_cache_variant(self, request):
+        return ''
+
+    def get_list_cache_key(self, request):
+        keys = scope_keys(self.list_cache_scopes, request.user)
+        versions = current_versions(request, keys)
+        params = sorted(request.query_params.lists())
+        parts = [
+            *(f'{key}={versions[key]}' for key in keys),
+            self.get_list_cache_variant(request),
+            request.build_absolute_uri('/'), # Absolute URLs in the payload depend on the host
+            repr(params),
+        ]
+        digest = hashlib.sha1('|'.join(parts).encode()).hexdigest()
+        return f'{self.list_cache_prefix}:{digest}'
+
+    def list(self, request, *args, **kwargs):
+        key = self.get_list_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, settings.LIST_CACHE_TIMEOUT)
+        return response
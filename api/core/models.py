@@ -0,0 +1,115 @@
+from django.db import IntegrityError, models, transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+class VersionStamp(models.Model):
+    """
+    A named counter that is bumped whenever the data it covers changes
+    (e.g. the store catalog, or everything visible to one school).
+    Used to build cheap validators (ETags, cache keys) without reading the data itself.
+    """
+    key = models.CharField(max_length=100, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.key} v{self.version}"
+
+    class Meta:
+        verbose_name = _("Version Stamp")
+        verbose_name_plural = _("Version Stamps")
+
+    @classmethod
+    def bump(cls, key):
+        """Increments the version for `key`, creating it on first use."""
+        updated = cls.objects.filter(key=key).update(version=models.F('version') + 1, updated_at=timezone.now())
+        if not updated:
+            try:
+                with transaction.atomic():
+                    cls.objects.create(key=key, version=1)
+            except IntegrityError:
+                # Someone else created it first; count our change on top.
+                cls.objects.filter(key=key).update(version=models.F('version') + 1, updated_at=timezone.now())
+
+    @classmethod
+    def current(cls, keys):
+        """Returns {key: version} for the given keys, with 0 for keys never bumped."""
+        versions = dict(cls.objects.filter(key__in=keys).values_list('key', 'version'))
+        return {key: versions.get(key, 0) for key in keys}
+
+
+class StoredFile(models.Model):
+    """
+    Reference count for a file in ContentAddressedStorage (core.storage).
+    Identical uploads share one file; it is removed only when the last reference goes.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    references = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.references} ref)"
+
+    class Meta:
+        verbose_name = _("Stored File")
+        verbose_name_plural = _("Stored Files")
+
+    @classmethod
+    def acquire(cls, name):
+        """Adds a reference to `name`. Returns True if the file had no record yet."""
+        if cls.objects.filter(name=name).update(references=models.F('references') + 1):
+            return False
+        try:
+            with transaction.atomic():
+                cls.objects.create(name=name, references=1)
+            return True
+        except IntegrityError:
+            cls.objects.filter(name=name).update(references=models.F('references') + 1)
+            return False
+
+    @classmethod
+    def release(cls, name):
+        """
+        Drops a reference to `name`. Returns the references left, or None when the file
+        is not tracked at all (e.g. uploaded before content addressing).
+        """
+        if not cls.objects.filter(name=name, references__gt=0).update(references=models.F('references') - 1):
+            return 0 if cls.objects.filter(name=name).exists() else None
+        return cls.objects.filter(name=name).values_list('references', flat=True).first() or 0
+
+
+class SearchDocument(models.Model):
+    """
+    The searchable text of one object, kept in sync by core.search. Backed by a
+    trigram GIN index on PostgreSQL and an FTS5 table on SQLite (see migration 0003).
+    """
+    kind = models.CharField(max_length=100) # Model label, e.g. 'students.studentprofile'
+    object_id = models.BigIntegerField()
+    body = models.TextField()
+
+    def __str__(self):
+        return f"{self.kind}#{self.object_id}"
+
+    class Meta:
+        verbose_name = _("Search Document")
+        verbose_name_plural = _("Search Documents")
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='core_searchdocument_object_uniq'),
+        ]
+
+
+class IdSequence(models.Model):
+    """
+    The next free id of a model whose rows are spread over several databases
+    (core.shards), so ids never collide between them.
+    """
+    name = models.CharField(max_length=100, unique=True) # Model label, e.g. 'users.user'
+    next_id = models.PositiveBigIntegerField()
+
+    def __str__(self):
+        return f"{self.name} @ {self.next_id}"
+
+    class Meta:
+        verbose_name = _("Id Sequence")
+        verbose_name_plural = _("Id Sequences")
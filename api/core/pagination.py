@@ -1,5 +1,14 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Max, Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 class CustomPagination(PageNumberPagination):
     """
@@ -20,4 +29,153 @@ class CustomPagination(PageNumberPagination):
                     'currentPage': self.page.number,
                 }
             }
-        })
\ No newline at end of file
+        })
+
+
+class RankPaginator(Paginator):
+    """
+    Paginates a queryset over a dense, 1-based `rank` column.
+    Pages are fetched with a rank range (an index range scan) instead of OFFSET,
+    and the count is the highest rank rather than a COUNT(*) over the whole set.
+    """
+    rank_field = 'rank'
+
+    @cached_property
+    def count(self):
+        return self.object_list.aggregate(highest=Max(self.rank_field))['highest'] or 0
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page
+        object_list = self.object_list.filter(**{
+            f'{self.rank_field}__gt': bottom,
+            f'{self.rank_field}__lte': top,
+        })
+        return self._get_page(object_list, number, self)
+
+
+class RankPagination(CustomPagination):
+    """
+    Same response format as CustomPagination, for querysets ordered by a maintained rank.
+    """
+    django_paginator_class = RankPaginator
+
+
+
+class KeysetPagination(CustomPagination):
+    """
+    Page-number pagination by default, with an opt-in keyset (seek) mode for append-only logs.
+
+    Sending `?cursor=` (empty for the first page) switches to keyset mode: rows are
+    ordered by the view's `keyset_ordering` (e.g. ('-date', '-id')) and each page seeks
+    past the last row of the previous one, so there is no COUNT(*) and no OFFSET scan.
+    The `{success, data: {items, pagination}}` envelope is kept; only the
+    `nextPage`/`previousPage` links are returned in keyset mode.
+    """
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param not in request.query_params:
+            self.keyset_mode = False
+            return super().paginate_queryset(queryset, request, view)
+
+        self.keyset_mode = True
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = tuple(view.keyset_ordering)
+        self.fields = [field.lstrip('-') for field in self.ordering]
+        position, reverse = self.decode_cursor(request, queryset.model)
+
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(field[1:] if field.startswith('-') else f'-{field}' for field in ordering)
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.seek_filter(ordering, position))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.next_position = self.previous_position = None
+        if rows and (has_more or reverse):
+            self.next_position = self.get_position(rows[-1])
+        if rows and (has_more if reverse else position is not None):
+            self.previous_position = self.get_position(rows[0])
+        return rows
+
+    def seek_filter(self, ordering, position):
+        """Builds `(k1, k2, ...) > position` in the given ordering as a chain of ORs."""
+        condition = Q()
+        equal = {}
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        return condition
+
+    def get_position(self, row):
+        values = []
+        for field in self.fields:
+            value = row[field] if isinstance(row, dict) else getattr(row, field)
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        return values
+
+    def encode_cursor(self, position, reverse=False):
+        payload = json.dumps({'p': position, 'r': reverse}, separators=(',', ':'))
+        token = base64.urlsafe_b64encode(payload.encode()).decode()
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request, model):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode()))
+            position, reverse = payload['p'], bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.fields):
+            raise NotFound(self.invalid_cursor_message)
+        # Check each value against its field, so a forged cursor never reaches the query.
+        try:
+            position = [model._meta.get_field(name).to_python(value) for name, value in zip(self.fields, position)]
+        except (ValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if None in position:
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def get_next_link(self):
+        if not getattr(self, 'keyset_mode', False):
+            return super().get_next_link()
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position)
+
+    def get_previous_link(self):
+        if not getattr(self, 'keyset_mode', False):
+            return super().get_previous_link()
+        if self.previous_position is None:
+            return None
+        return self.encode_cursor(self.previous_position, reverse=True)
+
+    def get_paginated_response(self, data):
+        if not self.keyset_mode:
+            return super().get_paginated_response(data)
+        return Response({
+            'success': True,
+            'data': {
+                'items': data,
+                'pagination': {
+                    'nextPage': self.get_next_link(),
+                    'previousPage': self.get_previous_link(),
+                }
+            }
+        })
@@ -0,0 +1,45 @@
+# core/passwords.py
+
+"""
+Password hashing for many users at once.
+
+Hashing is deliberately slow (PBKDF2 runs a million iterations per password), so
+a roster of hundreds of students is hashed across the worker pool (core.workers)
+instead of one password after another in the request. `hash_many()` runs in the
+worker processes and must not touch settings or the database: the hasher is
+chosen in the parent and passed by its dotted path.
+"""
+
+from django.contrib.auth.hashers import get_hasher
+from django.utils.module_loading import import_string
+
+from core import workers
+
+# Below this many passwords, starting the pool costs more than it saves.
+POOL_MIN_PASSWORDS = 16
+
+
+def hash_many(hasher_path, passwords):
+    """Hashes each password with its own salt (runs in a worker process)."""
+    hasher = import_string(hasher_path)()
+    return [hasher.encode(password, hasher.salt()) for password in passwords]
+
+
+def make_passwords(passwords):
+    """
+    Returns the encoded form of each password, like make_password(), in order.
+    Large batches are split into chunks and hashed in parallel.
+    """
+    passwords = list(passwords)
+    hasher = get_hasher()
+    hasher_path = f'{type(hasher).__module__}.{type(hasher).__qualname__}'
+    if len(passwords) < POOL_MIN_PASSWORDS:
+        return hash_many(hasher_path, passwords)
+
+    # A few chunks per worker keeps them all busy until the end.
+    size = max(1, -(-len(passwords) // (workers.worker_count() * 4)))
+    chunks = [passwords[start:start + size] for start in range(0, len(passwords), size)]
+    encoded = []
+    for chunk in workers.run_batch(hash_many, [(hasher_path, chunk) for chunk in chunks]):
+        encoded.extend(chunk)
+    return encoded
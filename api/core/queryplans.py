@@ -0,0 +1,142 @@
+# core/queryplans.py
+
+"""
+Query plan checks for the hot list endpoints.
+
+`seed()` bulk-inserts a few schools of students with XP logs and purchases, and
+`list_query_plans()` requests an endpoint, finds its ordered list query and
+EXPLAINs it. A plan that scans the list's table or sorts means an index stopped
+serving the list. Used by core.tests.test_query_plans (run by `manage.py test`) and
+`manage.py check_query_plans`, which prints the plans.
+"""
+
+import json
+import re
+
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+# (name, URL, table the list is read from). `{student}` is replaced by a seeded student's id.
+CASES = [
+    ('users', '/api/v1/users/', 'users_user'),
+    ('students by XP', '/api/v1/students/profiles/?ordering=-total_xp', 'students_studentprofile'),
+    ('leaderboard', '/api/v1/students/leaderboard/', 'students_studentprofile'),
+    ('leaderboard, page 3', '/api/v1/students/leaderboard/?page=3', 'students_studentprofile'),
+    ('XP history', '/api/v1/students/xp-history/', 'students_xpgrantlog'),
+    ('XP history, keyset', '/api/v1/students/xp-history/?cursor=', 'students_xpgrantlog'),
+    ('transactions', '/api/v1/store/transactions/', 'store_transaction'),
+    ('transactions, keyset', '/api/v1/store/transactions/?cursor=', 'store_transaction'),
+    ('one student\'s transactions', '/api/v1/store/transactions/?student__id={student}', 'store_transaction'),
+]
+
+
+class PlanCheckError(Exception):
+    """The endpoint could not be checked (an error response, or no list query was found)."""
+
+
+def seed(schools=3, students=200, log_rows=5000):
+    """
+    Bulk-inserts schools of students with XP logs and purchases (no signals, no hashing).
+    Returns a teacher and a student of the first school.
+    """
+    from store.models import StoreItem, Transaction
+    from students import leaderboard
+    from students.models import StudentProfile, XpGrantLog
+    from users.models import School, User
+
+    school_rows = School.objects.bulk_create([School(name=f'School {n}', code=f'school-{n}') for n in range(schools)])
+    teachers = User.objects.bulk_create([
+        User(username=f'teacher-{school.pk}', password='!', role=User.Role.TEACHER, is_staff=True, school=school)
+        for school in school_rows
+    ])
+    users = User.objects.bulk_create([
+        User(username=f'student-{school.pk}-{n}', password='!', full_name=f'Student {n:05d}', school=school)
+        for school in school_rows for n in range(students)
+    ])
+    StudentProfile.objects.bulk_create([
+        StudentProfile(user=user, school_id=user.school_id, total_xp=(user.pk * 37) % 1000, available_xp=0)
+        for user in users
+    ])
+    for school in school_rows:
+        leaderboard.rebuild(school.pk)
+    item = StoreItem.objects.create(name='Sticker', xp_cost=10, stock_quantity=10 ** 6)
+    by_school = {teacher.school_id: teacher for teacher in teachers}
+    XpGrantLog.objects.bulk_create([
+        XpGrantLog(student=users[n % len(users)], teacher=by_school[users[n % len(users)].school_id],
+                   amount=5, reason='Seed', school_id=users[n % len(users)].school_id)
+        for n in range(log_rows)
+    ], batch_size=1000)
+    Transaction.objects.bulk_create([
+        Transaction(student=users[n % len(users)], item=item, xp_cost_at_purchase=10,
+                    school_id=users[n % len(users)].school_id)
+        for n in range(log_rows)
+    ], batch_size=1000)
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    return teachers[0], users[0]
+
+
+def _explain_sqlite(cursor, sql, table):
+    cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+    details = [row[-1] for row in cursor.fetchall()]
+    scan = re.compile(rf'^SCAN "?{re.escape(table)}"?(?! USING)')
+    problems = []
+    if any(scan.match(detail) for detail in details):
+        problems.append(f'sequential scan of {table}')
+    if any(detail.startswith('USE TEMP B-TREE FOR') and 'ORDER BY' in detail for detail in details):
+        problems.append('sort')
+    return details, problems
+
+
+def _explain_postgresql(cursor, sql, table):
+    # Without the seqscan option a planner would rightly scan tables this small; forbidding
+    # it shows whether an index can serve the query at all.
+    cursor.execute('SET LOCAL enable_seqscan = off')
+    cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+    plan = cursor.fetchone()[0]
+    plan = json.loads(plan) if isinstance(plan, str) else plan
+    nodes, stack = [], [plan[0]['Plan']]
+    while stack:
+        node = stack.pop()
+        nodes.append(node)
+        stack.extend(node.get('Plans', ()))
+    details = [f"{node['Node Type']} {node.get('Relation Name', '')} {node.get('Index Name', '')}".strip() for node in nodes]
+    problems = []
+    if any(node['Node Type'] == 'Seq Scan' and node.get('Relation Name') == table for node in nodes):
+        problems.append(f'sequential scan of {table}')
+    if any(node['Node Type'] in ('Sort', 'Incremental Sort') for node in nodes):
+        problems.append('sort')
+    return details, problems
+
+
+EXPLAINERS = {'sqlite': _explain_sqlite, 'postgresql': _explain_postgresql}
+
+
+def supported():
+    return connection.vendor in EXPLAINERS
+
+
+def list_query_plans(client, url, table):
+    """
+    Requests `url` with `client` and EXPLAINs each ordered query on `table` it ran.
+    Returns (sql, plan details, problems) for each of them. Run on the primary
+    database, with the read-replica router disabled.
+    """
+    explain = EXPLAINERS[connection.vendor]
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+    if response.status_code != 200:
+        raise PlanCheckError(f'{url} answered {response.status_code}.')
+    list_queries = [
+        query['sql'] for query in queries.captured_queries
+        if re.search(rf'\bFROM "{re.escape(table)}"', query['sql']) and ' ORDER BY ' in query['sql']
+    ]
+    if not list_queries:
+        raise PlanCheckError(f'No ordered query on {table} was found for {url}.')
+
+    plans = []
+    for sql in list_queries:
+        with transaction.atomic(), connection.cursor() as cursor:
+            details, problems = explain(cursor, sql, table)
+        plans.append((sql, details, problems))
+    return plans
@@ -1,11 +1,77 @@
-from drf_camel_case.render import CamelCaseJSONRenderer
+import re
+from functools import lru_cache
 
-class CustomJSONRenderer(CamelCaseJSONRenderer):
+import orjson
+from django.utils.encoding import force_str
+from django.utils.functional import Promise
+from drf_camel_case.settings import api_settings as camel_case_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+_camelize_re = re.compile(r"[a-z0-9]?_[a-z0-9]")
+_fallback_encoder = JSONEncoder()
+
+
+def _underscore_to_camel(match):
+    group = match.group()
+    if len(group) == 3:
+        return group[0] + group[2].upper()
+    return group[1].upper()
+
+
+@lru_cache(maxsize=4096)
+def camelize_key(key):
+    """snake_case -> camelCase, with the exact rules of drf_camel_case, memoized per key."""
+    if "_" not in key:
+        return key
+    return _camelize_re.sub(_underscore_to_camel, key)
+
+
+def camelize(data, ignore_fields=()):
+    """
+    Recursively camelizes dict keys, producing plain dicts and lists.
+    Equivalent to drf_camel_case.util.camelize, but every key conversion is a cache hit
+    after the first response and scalars are returned without further checks.
+    """
+    if isinstance(data, dict):
+        new_dict = {}
+        for key, value in data.items():
+            if isinstance(key, Promise):
+                key = force_str(key)
+            new_key = camelize_key(key) if isinstance(key, str) else key
+            if ignore_fields and (key in ignore_fields or new_key in ignore_fields):
+                new_dict[new_key] = value
+            else:
+                new_dict[new_key] = camelize(value, ignore_fields)
+        return new_dict
+    if isinstance(data, (list, tuple)):
+        return [camelize(item, ignore_fields) for item in data]
+    if data is None or isinstance(data, (str, int, float)):
+        return data
+    if isinstance(data, Promise):
+        return force_str(data)
+    if hasattr(data, '__iter__') and not isinstance(data, (bytes, bytearray)):
+        return [camelize(item, ignore_fields) for item in data]
+    return data
+
+
+def _default(obj):
+    # Anything orjson can't encode natively (Decimal, lazy strings, datetimes with
+    # DRF's 'Z' suffix, querysets...) is handled exactly like DRF's JSONEncoder.
+    return _fallback_encoder.default(obj)
+
+
+class CustomJSONRenderer(JSONRenderer):
     """
     A custom renderer to wrap all successful API responses in a consistent format.
     It ensures that the final output is always a JSON object with a 'success' key.
+    Keys are camelized with a memoized converter and the result is encoded with orjson.
     """
+    orjson_options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+    ignore_fields = tuple(camel_case_settings.JSON_UNDERSCOREIZE.get('ignore_fields') or ())
+
     def render(self, data, accepted_media_type=None, renderer_context=None):
+        renderer_context = renderer_context or {}
         response = renderer_context.get('response')
 
         # If the response is an error, the custom exception handler will format it.
@@ -15,8 +81,18 @@ class CustomJSONRenderer(CamelCaseJSONRenderer):
         if response and 200 <= response.status_code < 300 and data and 'success' not in data:
             # Our custom paginator already formats the response, so we don't re-wrap it.
             # We wrap everything else.
-            wrapped_data = {'success': True, 'data': data}
-            return super().render(wrapped_data, accepted_media_type, renderer_context)
-        
+            data = {'success': True, 'data': data}
+
         # For paginated or already-wrapped data, and for errors handled by the exception handler
-        return super().render(data, accepted_media_type, renderer_context)
\ No newline at end of file
+        if data is None:
+            return b''
+
+        options = self.orjson_options
+        if self.get_indent(accepted_media_type, renderer_context) is not None:
+            options |= orjson.OPT_INDENT_2
+        ret = orjson.dumps(camelize(data, self.ignore_fields), default=_default, option=options)
+
+        # Like DRF, escape \u2028 and \u2029 so the output is a strict JavaScript subset.
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
@@ -0,0 +1,285 @@
+# core/search.py
+
+"""
+Indexed search for list endpoints.
+
+DRF's SearchFilter turns `?search=` into `icontains` predicates over several
+(often joined) columns, which no index can serve. Here, every object of a
+registered model has a SearchDocument: the lowercased text of its searchable
+fields, one field per line. A search looks the terms up in that one table and
+keeps the matching objects:
+
+- PostgreSQL: `LIKE` on `body`, served by a pg_trgm GIN index, ranked by
+  `word_similarity()`;
+- SQLite: an FTS5 trigram table, ranked by bm25;
+- anything else: `LIKE` on `body` alone.
+
+Every term must occur somewhere in the document (as a substring, so prefixes
+match while typing). Unless the client asked for an ordering, results whose
+fields start with the first term come first, then by relevance.
+
+Documents are written on save and removed on delete, also when a related object
+that contributes text (e.g. a student's username on their XP logs) changes.
+Code that bypasses signals (bulk_create, update) calls `index()` itself;
+`manage.py rebuild_search_index` rebuilds everything. Documents are stored on
+the database of their object, so each school's live on its shard (core.shards).
+"""
+
+from django.apps import apps as global_apps
+from django.db import DEFAULT_DB_ALIAS, connections, models, router
+from django.db.models import Case, F, FloatField, Func, OuterRef, Q, Subquery, Value, When
+from django.db.models.signals import post_delete, post_save
+
+from . import shards
+from .models import SearchDocument
+
+FTS_TABLE = 'core_searchdocument_fts'
+FTS_MIN_TERM_LENGTH = 3 # Trigrams: shorter terms cannot use the index
+
+_registry = {} # model -> SearchSpec
+_fts_available = {} # database alias -> bool
+
+
+class SearchSpec:
+    """How the document of one model is built, and which related saves change it."""
+    def __init__(self, model, fields, follow):
+        self.model = model
+        self.kind = model._meta.label_lower
+        self.fields = tuple(fields)
+        # Related model label -> lookups from `model` to it (e.g. {'users.User': ['student']}).
+        self.follow = {label: tuple(lookups) for label, lookups in follow.items()}
+
+    def related_fields(self, lookup):
+        """The fields of the related model (reached through `lookup`) that the document reads."""
+        prefix = f'{lookup}__'
+        return {field[len(prefix):].split('__')[0] for field in self.fields if field.startswith(prefix)}
+
+
+def register(model, fields, follow=None):
+    """
+    Indexes `fields` (lookups, like SearchFilter's search_fields) of `model`.
+    `follow` maps related model labels to the lookups that reach them, so their
+    saves refresh the documents that include their text.
+    """
+    spec = SearchSpec(model, fields, follow or {})
+    _registry[model] = spec
+    post_save.connect(_object_saved, sender=model, dispatch_uid=f'search-save-{spec.kind}')
+    post_delete.connect(_object_deleted, sender=model, dispatch_uid=f'search-delete-{spec.kind}')
+    for label in spec.follow:
+        related = global_apps.get_model(label)
+        post_save.connect(_related_saved, sender=related, dispatch_uid=f'search-follow-{label.lower()}')
+    return spec
+
+
+def get_spec(model):
+    return _registry.get(model)
+
+
+def registered_models():
+    return list(_registry)
+
+
+def document_body(values):
+    return '\n'.join(str(value).lower() for value in values if value not in (None, ''))
+
+
+def index(model, objects=None, using=None):
+    """
+    Brings the documents of `objects` (a queryset or primary keys of `model`; all of
+    them by default) up to date, writing only those whose text changed. They are
+    written to the database the objects are read from.
+    Returns the number of documents written.
+    """
+    spec = _registry[model]
+    if isinstance(objects, models.QuerySet):
+        queryset = objects
+    else:
+        queryset = model._default_manager.db_manager(using or router.db_for_write(model)).all()
+        if objects is not None:
+            queryset = queryset.filter(pk__in=list(objects))
+    using = queryset.db
+
+    written = 0
+    batch = []
+    for row in queryset.order_by().values_list('pk', *spec.fields).iterator(chunk_size=2000):
+        batch.append(row)
+        if len(batch) == 2000:
+            written += _write(spec, batch, using)
+            batch = []
+    if batch:
+        written += _write(spec, batch, using)
+    return written
+
+
+def _write(spec, rows, using):
+    documents = SearchDocument.objects.using(using)
+    bodies = {pk: document_body(values) for pk, *values in rows}
+    existing = {
+        object_id: (pk, body) for pk, object_id, body in
+        documents.filter(kind=spec.kind, object_id__in=bodies.keys()).values_list('pk', 'object_id', 'body')
+    }
+    created = [
+        SearchDocument(kind=spec.kind, object_id=object_id, body=body)
+        for object_id, body in bodies.items() if object_id not in existing
+    ]
+    changed = [
+        SearchDocument(pk=existing[object_id][0], body=body)
+        for object_id, body in bodies.items() if object_id in existing and existing[object_id][1] != body
+    ]
+    documents.bulk_create(created, batch_size=500)
+    documents.bulk_update(changed, ['body'], batch_size=500)
+    return len(created) + len(changed)
+
+
+def unindex(model, pks, using=None):
+    documents = SearchDocument.objects.using(using or router.db_for_write(model))
+    documents.filter(kind=_registry[model].kind, object_id__in=list(pks)).delete()
+
+
+def _object_saved(sender, instance, created, using, update_fields=None, **kwargs):
+    spec = _registry[sender]
+    if update_fields is not None and not {field.split('__')[0] for field in spec.fields} & set(update_fields):
+        return
+    index(sender, [instance.pk], using=using)
+
+
+def _object_deleted(sender, instance, using, **kwargs):
+    unindex(sender, [instance.pk], using=using)
+
+
+def _related_saved(sender, instance, created, using, update_fields=None, **kwargs):
+    if created:
+        return # Nothing refers to it yet
+    for spec in list(_registry.values()):
+        # A shared object (e.g. a store item) is referred to from every school's database.
+        databases = [using] if shards.is_sharded(sender) else shards.databases_of(spec.model)
+        for lookup in spec.follow.get(sender._meta.label, ()):
+            fields = spec.related_fields(lookup)
+            if update_fields is not None and not fields & set(update_fields):
+                continue
+            for database in databases:
+                index(spec.model, spec.model._default_manager.using(database).filter(**{lookup: instance.pk}))
+
+
+def rebuild(model, using=None):
+    """Re-indexes every object of `model` on a database and drops documents of deleted objects."""
+    using = using or router.db_for_write(model)
+    written = index(model, using=using)
+    kind = _registry[model].kind
+    removed, _ = SearchDocument.objects.using(using).filter(kind=kind).exclude(
+        object_id__in=model._default_manager.using(using).values('pk')
+    ).delete()
+    return written, removed
+
+
+def build_missing_index(sender, using=DEFAULT_DB_ALIAS, apps=global_apps, **kwargs):
+    """
+    post_migrate: fills the index the first time it is empty while there is data
+    to index (e.g. right after the migration that creates it).
+    """
+    try:
+        apps.get_model('core', 'SearchDocument')
+    except LookupError:
+        return # Migrated back to before the index existed
+    if using != DEFAULT_DB_ALIAS or SearchDocument.objects.exists():
+        return
+    for model in registered_models():
+        if model._default_manager.exists():
+            index(model)
+
+
+# Querying
+
+def fts_available(using):
+    """Whether the SQLite FTS5 table exists (SQLite may be built without FTS5)."""
+    if using not in _fts_available:
+        with connections[using].cursor() as cursor:
+            _fts_available[using] = FTS_TABLE in connections[using].introspection.table_names(cursor)
+    return _fts_available[using]
+
+
+def backend_for(using):
+    vendor = connections[using].vendor
+    if vendor == 'postgresql':
+        return 'trigram'
+    if vendor == 'sqlite' and fts_available(using):
+        return 'fts5'
+    return 'like'
+
+
+def _fts_query(terms):
+    # Each term as an FTS5 string (double quotes doubled); adjacent strings are ANDed.
+    return ' '.join('"%s"' % term.replace('"', '""') for term in terms)
+
+
+class FtsMatch(Func):
+    """`rowid IN (SELECT rowid FROM fts WHERE fts MATCH <query>)`, for the document's id."""
+    template = f'%(expressions)s IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %%s)'
+    output_field = models.BooleanField()
+
+    def __init__(self, expression, query):
+        super().__init__(expression)
+        self.query = query
+
+    def as_sql(self, compiler, connection, **extra_context):
+        sql, params = super().as_sql(compiler, connection, **extra_context)
+        return sql, (*params, self.query)
+
+
+class Bm25(Func):
+    """The (positive) bm25 relevance of the document with the given id."""
+    template = (
+        f'(SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} '
+        f'WHERE {FTS_TABLE} MATCH %%s AND rowid = %(expressions)s)'
+    )
+    output_field = FloatField()
+
+    def __init__(self, expression, query):
+        super().__init__(expression)
+        self.query = query
+
+    def as_sql(self, compiler, connection, **extra_context):
+        sql, params = super().as_sql(compiler, connection, **extra_context)
+        return sql, (self.query, *params)
+
+
+def search(queryset, terms, rank=True):
+    """
+    Keeps the objects of `queryset` whose document contains every term. With `rank`,
+    orders them by relevance (ahead of the queryset's own ordering, which breaks ties).
+    """
+    spec = _registry[queryset.model]
+    using = queryset.db
+    backend = backend_for(using)
+    terms = [term.lower() for term in terms if term]
+
+    documents = SearchDocument.objects.using(using).filter(kind=spec.kind)
+    long_terms = [term for term in terms if len(term) >= FTS_MIN_TERM_LENGTH]
+    if backend == 'fts5' and long_terms:
+        documents = documents.filter(FtsMatch(F('id'), _fts_query(long_terms)))
+        short_terms = [term for term in terms if len(term) < FTS_MIN_TERM_LENGTH]
+    else:
+        short_terms = terms
+    for term in short_terms:
+        documents = documents.filter(body__contains=term)
+    queryset = queryset.filter(pk__in=documents.values('object_id'))
+    if not rank:
+        return queryset
+
+    own = SearchDocument.objects.using(using).filter(kind=spec.kind, object_id=OuterRef('pk'))
+    first = terms[0]
+    starts_with_first = Q(body__startswith=first) | Q(body__contains=f'\n{first}') | Q(body__contains=f' {first}')
+    prefix = own.annotate(value=Case(When(starts_with_first, then=Value(1)), default=Value(0))).values('value')[:1]
+    if backend == 'trigram':
+        score = Func(Value(' '.join(terms)), F('body'), function='word_similarity', output_field=FloatField())
+    elif backend == 'fts5' and long_terms:
+        score = Bm25(F('id'), _fts_query(long_terms))
+    else:
+        score = Value(0.0)
+    relevance = own.annotate(value=score).values('value')[:1]
+
+    ordering = queryset.query.order_by or queryset.model._meta.ordering
+    return queryset.annotate(
+        search_prefix=Subquery(prefix, output_field=models.IntegerField()),
+        search_rank=Subquery(relevance, output_field=FloatField()),
+    ).order_by('-search_prefix', '-search_rank', *ordering)
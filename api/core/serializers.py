@@ -0,0 +1,116 @@
+# core/serializers.py
+
+from django.core.files.storage import default_storage
+from rest_framework import serializers
+
+_datetime_field = serializers.DateTimeField()
+
+
+def format_datetime(value):
+    """A datetime as the API writes it (DRF's DateTimeField, e.g. `2024-08-15T14:30:00.123456Z`); None stays None."""
+    return None if value is None else _datetime_field.to_representation(value)
+
+
+def selection_subtree(tree, name):
+    """The part of a field-selection tree that applies inside the nested field `name`."""
+    return tree.get(name) if tree else None
+
+
+def media_url(name, request=None):
+    """The URL of a stored file, absolute when a request is available."""
+    url = default_storage.url(name)
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+class RowSerializer:
+    """
+    A lightweight, read-only serializer for rows produced by `QuerySet.values()`.
+
+    It emits the same JSON as the equivalent ModelSerializer without instantiating
+    models or running DRF's field machinery per row. Subclasses declare:
+    - `fields`: output names in order; each is also the values() lookup, unless it is
+      a key of `nested` or has a `get_<name>(row, prefix)` method.
+    - `nested`: output name -> RowSerializer subclass for a related object.
+    - `datetime_fields`: fields rendered like DRF's DateTimeField.
+    - `file_fields`: fields rendered like DRF's FileField (absolute URL or None).
+    - `method_lookups`: `get_<name>` field -> the columns that method reads.
+
+    `only` and `exclude` are optional field-selection trees (see core.mixins.SparseFieldsetMixin)
+    that trim both the output and the columns returned by `lookups()`.
+    """
+    fields = ()
+    nested = {}
+    datetime_fields = ()
+    file_fields = ()
+    method_lookups = {}
+
+    def __init__(self, instance=None, many=False, context=None, only=None, exclude=None):
+        self.instance = instance
+        self.many = many
+        self.context = context or {}
+        self.only = only
+        self.exclude = exclude
+
+    @classmethod
+    def selected_fields(cls, only=None, exclude=None):
+        return [
+            name for name in cls.fields
+            if (only is None or name in only)
+            and not (exclude and name in exclude and exclude[name] is None)
+        ]
+
+    @classmethod
+    def lookups(cls, prefix='', only=None, exclude=None):
+        """The values() lookups needed to serialize a row, relative to the queryset's model."""
+        paths = []
+        for name in cls.selected_fields(only, exclude):
+            if name in cls.nested:
+                child_prefix = f'{prefix}{name}__'
+                # The related id is always fetched so a null relation can be told apart.
+                paths.append(f'{child_prefix}id')
+                paths.extend(
+                    path for path in cls.nested[name].lookups(child_prefix, selection_subtree(only, name), selection_subtree(exclude, name))
+                    if path != f'{child_prefix}id'
+                )
+            elif hasattr(cls, f'get_{name}'):
+                paths.extend(f'{prefix}{lookup}' for lookup in cls.method_lookups.get(name, ()))
+            else:
+                paths.append(f'{prefix}{name}')
+        return paths
+
+    def file_url(self, name):
+        if not name:
+            return None
+        return media_url(name, self.context.get('request'))
+
+    def to_representation(self, row, prefix='', only=None, exclude=None):
+        data = {}
+        for name in self.selected_fields(only, exclude):
+            if name in self.nested:
+                serializer = self.nested[name](context=self.context)
+                child_prefix = f'{prefix}{name}__'
+                # A null foreign key shows up as a row of Nones.
+                data[name] = None if row[f'{child_prefix}id'] is None else serializer.to_representation(
+                    row, child_prefix, selection_subtree(only, name), selection_subtree(exclude, name)
+                )
+                continue
+            method = getattr(self, f'get_{name}', None)
+            if method is not None:
+                data[name] = method(row, prefix)
+                continue
+            value = row[f'{prefix}{name}']
+            if name in self.datetime_fields:
+                value = format_datetime(value)
+            elif name in self.file_fields:
+                value = self.file_url(value)
+            data[name] = value
+        return data
+
+    @property
+    def data(self):
+        rows = list(self.instance) if self.many else [self.instance]
+        # `get_<name>` methods, nested ones included, may batch lookups over all the rows.
+        self.context['rows'] = rows
+        if self.many:
+            return [self.to_representation(row, '', self.only, self.exclude) for row in rows]
+        return self.to_representation(self.instance, '', self.only, self.exclude)
@@ -0,0 +1,403 @@
+# core/shards.py
+
+"""
+Per-school databases (shards).
+
+With DATABASE_SHARD_URLS set, each school lives on one database, recorded in
+School.database: `default`, which also holds everything shared, or one of the
+shards `shard1`, `shard2`, ... Every database has the full schema.
+
+- Models registered with `register()` (users, student profiles, XP logs,
+  transactions, and the rows that hang off users) are school data.
+  dev_xp_camp.routers.ShardRouter sends their queries to the database of the
+  school of the instance at hand, or else of the current request or command
+  (set by authentication, or with `use_school()`).
+- Shared models (schools, store items) stay on `default`. Registered with
+  `replicate()`, their rows are also copied to every shard, so the joins and
+  foreign keys of school data work on any database. The copies follow save()
+  and delete() only (not update(), e.g. of stock), so read shared data from `default`.
+- Rows of school data take their ids from IdSequence on `default` (see
+  GlobalIdModel), so ids are unique across databases and a moved school keeps them.
+
+`manage.py move_school` moves a school between databases. While it runs, the
+school's data can be read but writes are refused with SchoolMoving (HTTP 503).
+"""
+
+import contextlib
+import contextvars
+import threading
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connections, models, router, transaction
+from django.db.models import F, Max
+from django.db.models.deletion import Collector
+from django.db.models.signals import post_delete, post_save
+from django.utils.translation import gettext_lazy as _
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from .models import IdSequence
+
+SHARD_PREFIX = 'shard'
+SCHOOL_MODEL = 'users.School'
+# Access and refresh tokens name the user's school, so a request is routed before its user is loaded.
+SCHOOL_CLAIM = 'schoolId'
+ID_BLOCK_SIZE = 100 # Ids reserved per model and process at a time
+
+_sharded = set() # Models whose rows live on their school's database
+_replicated = [] # Shared models copied to every shard
+
+
+class SchoolMoving(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _('This school is being moved to another database. Please try again in a few minutes.')
+    default_code = 'school_moving'
+
+
+def shard_aliases():
+    return [f'{SHARD_PREFIX}{number}' for number in range(1, len(settings.DATABASE_SHARD_URLS) + 1)]
+
+
+def enabled():
+    return bool(settings.DATABASE_SHARD_URLS)
+
+
+def databases():
+    """Every database that can hold school data: `default`, then the shards."""
+    return [DEFAULT_DB_ALIAS, *shard_aliases()]
+
+
+def register(model):
+    """Stores the rows of `model` on the database of their school."""
+    _sharded.add(model)
+
+
+def replicate(model):
+    """Keeps a copy of every row of the shared `model` on each shard."""
+    _replicated.append(model)
+    label = model._meta.label_lower
+    post_save.connect(_copy_saved, sender=model, dispatch_uid=f'shards-copy-{label}')
+    post_delete.connect(_delete_copies, sender=model, dispatch_uid=f'shards-delete-{label}')
+
+
+def is_sharded(model):
+    return model._meta.concrete_model in _sharded
+
+
+def is_replicated(model):
+    return model._meta.concrete_model in _replicated
+
+
+def databases_of(model):
+    """The databases that hold rows of `model`."""
+    return databases() if enabled() and is_sharded(model) else [router.db_for_write(model)]
+
+
+# Where schools live
+
+class SchoolDatabases:
+    """
+    School id -> (database, database it is moving to or ''), read from `default`
+    and kept in this process for SHARD_MAP_TTL seconds.
+    """
+    def __init__(self):
+        self._entries = {}
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, school_id):
+        if time.monotonic() >= self._expires_at or school_id not in self._entries:
+            self.reload()
+        return self._entries.get(school_id, (DEFAULT_DB_ALIAS, ''))
+
+    def reload(self):
+        School = apps.get_model(SCHOOL_MODEL)
+        rows = School._base_manager.using(DEFAULT_DB_ALIAS).values_list('pk', 'database', 'moving_to')
+        entries = {pk: (database, moving_to) for pk, database, moving_to in rows}
+        with self._lock:
+            self._entries = entries
+            self._expires_at = time.monotonic() + settings.SHARD_MAP_TTL
+
+    def clear(self):
+        with self._lock:
+            self._expires_at = 0.0
+
+
+schools = SchoolDatabases()
+
+
+def database_for_school(school_id, write=False):
+    """The database of a school. Raises SchoolMoving for writes while the school moves."""
+    if not enabled() or school_id is None:
+        return DEFAULT_DB_ALIAS
+    database, moving_to = schools.get(school_id)
+    if write and moving_to:
+        raise SchoolMoving()
+    return database
+
+
+# The school of the current request or command
+
+class ShardState:
+    """The school (or, for internal work, the database) that school data is read from and written to."""
+    def __init__(self, school_id=None, database=None):
+        self.school_id = school_id
+        self.database = database
+
+
+_state = contextvars.ContextVar('shard_state', default=None)
+
+
+def begin_request():
+    """Starts a request without a school. Returns a token for `end_request()`."""
+    return _state.set(ShardState())
+
+
+def end_request(token):
+    _state.reset(token)
+
+
+def activate(school_id):
+    """
+    Routes school data to `school_id`'s database for the rest of the request
+    (called once the user is known). Outside requests, use `use_school()`.
+    """
+    if not enabled():
+        return
+    state = _state.get()
+    if state is None:
+        _state.set(ShardState(school_id))
+    else:
+        state.school_id, state.database = school_id, None
+
+
+@contextlib.contextmanager
+def use_school(school_id):
+    """Routes school data to `school_id`'s database within the block."""
+    token = _state.set(ShardState(school_id))
+    try:
+        yield
+    finally:
+        _state.reset(token)
+
+
+@contextlib.contextmanager
+def use_database(database):
+    """Routes school data to `database` within the block (e.g. in signal receivers, with their `using`)."""
+    token = _state.set(ShardState(database=database))
+    try:
+        yield
+    finally:
+        _state.reset(token)
+
+
+def route(model, instance=None, write=False):
+    """
+    The database for school data of `model`, given the instance a query starts from
+    (the router's `instance` hint): that instance's school, else the database it was
+    loaded from, else the current school.
+    """
+    if instance is not None:
+        # Only loaded fields are consulted: reading a deferred one would query (and route) again.
+        if instance._meta.label == SCHOOL_MODEL:
+            school_id = instance.__dict__.get(instance._meta.pk.attname)
+        else:
+            school_id = instance.__dict__.get('school_id')
+        if school_id is not None:
+            return database_for_school(school_id, write)
+        if is_sharded(type(instance)) and instance._state.db:
+            return instance._state.db
+
+    state = _state.get()
+    if state is None:
+        return DEFAULT_DB_ALIAS
+    if state.school_id is not None:
+        return database_for_school(state.school_id, write)
+    return state.database or DEFAULT_DB_ALIAS
+
+
+def find(queryset, **lookup):
+    """
+    The first object of `queryset` matching `lookup` on any database, trying the
+    current one first. For lookups made before the school is known (e.g. a login).
+    """
+    current = queryset.db
+    for database in [current, *(alias for alias in databases() if alias != current)]:
+        obj = queryset.using(database).filter(**lookup).first()
+        if obj is not None:
+            return obj
+    return None
+
+
+def exists_anywhere(queryset, **lookup):
+    """Whether any database has an object of `queryset` matching `lookup` (for global uniqueness)."""
+    return any(queryset.using(database).filter(**lookup).exists() for database in databases())
+
+
+# Ids
+
+def _reserve_ids(model, count):
+    """Takes `count` consecutive ids for `model` from IdSequence. Returns the first one."""
+    name = model._meta.label_lower
+    sequences = IdSequence.objects.using(DEFAULT_DB_ALIAS)
+    with transaction.atomic(using=DEFAULT_DB_ALIAS):
+        if not sequences.filter(name=name).update(next_id=F('next_id') + count):
+            # First use: continue after the highest id on any database.
+            first = 1 + max(
+                model._base_manager.using(database).aggregate(top=Max('pk'))['top'] or 0
+                for database in databases()
+            )
+            try:
+                with transaction.atomic(using=DEFAULT_DB_ALIAS):
+                    sequences.create(name=name, next_id=first + count)
+                return first
+            except IntegrityError:
+                sequences.filter(name=name).update(next_id=F('next_id') + count)
+        return sequences.filter(name=name).values_list('next_id', flat=True).get() - count
+
+
+class IdAllocator:
+    """Hands out ids in this process from blocks reserved in IdSequence."""
+    def __init__(self):
+        self._blocks = {} # model label -> (next id, end of block)
+        self._lock = threading.Lock()
+
+    def allocate(self, model, count):
+        label = model._meta.label_lower
+        with self._lock:
+            next_id, end = self._blocks.get(label, (0, 0))
+            if end - next_id < count:
+                size = max(count, ID_BLOCK_SIZE)
+                next_id = _reserve_ids(model, size)
+                end = next_id + size
+            self._blocks[label] = (next_id + count, end)
+        return range(next_id, next_id + count)
+
+
+allocator = IdAllocator()
+
+
+def assign_ids(model, objs):
+    """Gives the objects of `objs` that have no primary key yet an allocated id (with shards only)."""
+    if not enabled():
+        return
+    missing = [obj for obj in objs if obj.pk is None]
+    if missing:
+        for obj, pk in zip(missing, allocator.allocate(model, len(missing))):
+            obj.pk = pk
+
+
+class GlobalIdManager(models.Manager):
+    """Manager whose bulk_create() allocates ids like GlobalIdModel.save()."""
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        assign_ids(self.model, objs)
+        return super().bulk_create(objs, *args, **kwargs)
+
+
+class GlobalIdModel(models.Model):
+    """
+    Base for school data with an auto primary key. With shards, a new row takes an
+    allocated id (see `assign_ids()`) instead of its database's own sequence.
+    """
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if self._state.adding and self.pk is None and enabled():
+            assign_ids(type(self), [self])
+            kwargs.setdefault('force_insert', True) # A fresh id: skip the UPDATE attempt
+        super().save(*args, **kwargs)
+
+
+# Copying rows between databases
+
+def insert_rows(model, database, fields, rows, batch_size=500):
+    """
+    INSERTs `rows` (tuples of values for `fields`) into `model`'s table on `database`,
+    as they are: unlike bulk_create(), auto_now(_add) fields keep their values.
+    """
+    connection = connections[database]
+    quote = connection.ops.quote_name
+    sql = 'INSERT INTO %s (%s) VALUES (%s)' % (
+        quote(model._meta.db_table),
+        ', '.join(quote(field.column) for field in fields),
+        ', '.join(['%s'] * len(fields)),
+    )
+    rows = list(rows)
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            cursor.executemany(sql, [
+                [field.get_db_prep_save(value, connection) for field, value in zip(fields, row)]
+                for row in rows[start:start + batch_size]
+            ])
+    return len(rows)
+
+
+def copy_rows(queryset, database, with_ids=True, chunk_size=2000):
+    """Copies the rows of `queryset` into `database`. Returns the number copied."""
+    model = queryset.model
+    fields = [field for field in model._meta.concrete_fields if with_ids or not field.primary_key]
+    rows = queryset.order_by().values_list(*[field.attname for field in fields]).iterator(chunk_size=chunk_size)
+    copied = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == chunk_size:
+            copied += insert_rows(model, database, fields, batch)
+            batch = []
+    return copied + insert_rows(model, database, fields, batch)
+
+
+def mirror_rows(queryset, database):
+    """Brings the copies of the rows of `queryset` on `database` up to date, adding missing ones."""
+    model = queryset.model
+    fields = model._meta.concrete_fields
+    target = model._base_manager.using(database)
+    rows = {row[0]: row for row in queryset.order_by().values_list('pk', *[field.attname for field in fields])}
+    existing = set(target.filter(pk__in=rows).values_list('pk', flat=True))
+    for pk in existing:
+        # update() writes the values as given (no auto_now) and sends no signals.
+        target.filter(pk=pk).update(**{
+            field.attname: value for field, value in zip(fields, rows[pk][1:]) if not field.primary_key
+        })
+    return insert_rows(model, database, fields, [row[1:] for pk, row in rows.items() if pk not in existing])
+
+
+def sync_shared_rows(database):
+    """Copies every row of the replicated models to the shard `database`."""
+    for model in _replicated:
+        mirror_rows(model._base_manager.using(DEFAULT_DB_ALIAS).all(), database)
+
+
+def _copy_saved(sender, instance, using, raw=False, **kwargs):
+    if raw or using != DEFAULT_DB_ALIAS:
+        return
+    for database in shard_aliases():
+        mirror_rows(sender._base_manager.using(DEFAULT_DB_ALIAS).filter(pk=instance.pk), database)
+
+
+def _delete_copies(sender, instance, using, **kwargs):
+    if using != DEFAULT_DB_ALIAS:
+        return
+    copies = [sender._base_manager.using(database).filter(pk=instance.pk) for database in shard_aliases()]
+    # Protected rows on any shard (e.g. a store item bought there) fail the whole delete
+    # before a copy is touched; raising here rolls back the delete on `default` too.
+    for copy in copies:
+        Collector(using=copy.db).collect(copy)
+    for copy in copies:
+        copy.delete()
+
+
+def sync_after_migrate(sender, using=DEFAULT_DB_ALIAS, apps=apps, **kwargs):
+    """post_migrate: fills a freshly migrated shard with the shared rows."""
+    if using not in shard_aliases():
+        return
+    try:
+        for model in _replicated:
+            apps.get_model(model._meta.label)
+    except LookupError:
+        return # Migrated back to before a shared model existed
+    sync_shared_rows(using)
@@ -0,0 +1,197 @@
+# core/spa.py
+
+"""
+Delivery of the React build: the SPA shell (index.html) and its static assets.
+
+The shell is rendered through the template engine once per process, compressed
+once, and served from memory with an ETag, so a navigation costs a header check.
+Static assets are served from disk with the `.br`/`.gz` siblings written by
+`manage.py compress_static`, chosen by Accept-Encoding. Vite's hashed files
+under `assets/` are cached as immutable.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import posixpath
+import re
+import threading
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import Http404, HttpResponse
+from django.template import TemplateDoesNotExist
+from django.template.loader import render_to_string
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.views.decorators.http import require_safe
+
+from core.media import serve_file
+
+try:
+    import brotli
+except ImportError: # Optional: without it only gzip is produced and served
+    brotli = None
+
+SHELL_TEMPLATE = 'index.html'
+COMPRESSIBLE_EXTENSIONS = ('.js', '.mjs', '.css', '.html', '.svg', '.json', '.map', '.txt', '.xml', '.ico', '.wasm')
+COMPRESS_MIN_SIZE = 256
+
+# Vite writes content-hashed files to `assets/`; ManifestStaticFilesStorage adds `.<12 hex>.`
+_IMMUTABLE_RE = re.compile(r'(^assets/|\.[0-9a-f]{12}\.[^/.]+$)')
+_lock = threading.Lock()
+_shell = None
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=11)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def available_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def accepted_encodings(request):
+    """The encodings the client accepts, in our order of preference."""
+    accepted = {}
+    for part in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                continue
+        if coding:
+            accepted[coding.strip().lower()] = quality
+    return [
+        encoding for encoding in ('br', 'gzip')
+        if accepted.get(encoding, accepted.get('*', 0)) > 0
+    ]
+
+
+class Shell:
+    """The rendered shell, with its compressed forms and their ETags."""
+    def __init__(self, body):
+        self.body = body
+        self.digest = hashlib.sha256(body).hexdigest()[:32]
+        self.encoded = {encoding: compress(body, encoding) for encoding in available_encodings()}
+
+    def etag(self, encoding=None):
+        """A strong ETag per content-coding (RFC 9110 8.8.3): each body differs byte for byte."""
+        return f'"{self.digest}-{encoding}"' if encoding else f'"{self.digest}"'
+
+
+def load_shell(refresh=False):
+    """Renders the shell once (every time in DEBUG, so rebuilds show up)."""
+    global _shell
+    if _shell is None or refresh or settings.DEBUG:
+        with _lock:
+            if _shell is None or refresh or settings.DEBUG:
+                _shell = Shell(render_to_string(SHELL_TEMPLATE).encode())
+    return _shell
+
+
+def warm_shell():
+    """Renders the shell at startup (called from wsgi.py/asgi.py) rather than on the first navigation."""
+    try:
+        load_shell()
+    except TemplateDoesNotExist:
+        pass # No frontend build, e.g. an API-only deployment
+
+
+@require_safe
+def spa_shell(request):
+    shell = load_shell()
+    encoding = next((encoding for encoding in accepted_encodings(request) if encoding in shell.encoded), None)
+    etag = shell.etag(encoding)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(shell.encoded[encoding] if encoding else shell.body, content_type='text/html; charset=utf-8')
+        if encoding:
+            response['Content-Encoding'] = encoding
+    response['ETag'] = etag
+    # The shell names the current build's assets, so it must always be revalidated.
+    response['Cache-Control'] = 'no-cache'
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+def _static_path(path):
+    if settings.STATIC_ROOT:
+        try:
+            full_path = safe_join(settings.STATIC_ROOT, path)
+        except SuspiciousFileOperation:
+            raise Http404("File not found.")
+        if os.path.isfile(full_path):
+            return full_path
+    # Not collected (yet): fall back to the app and STATICFILES_DIRS locations.
+    full_path = finders.find(path)
+    if not full_path:
+        raise Http404("File not found.")
+    return full_path
+
+
+@require_safe
+def serve_static(request, path):
+    """
+    Serves a static file, preferring an up-to-date `.br` or `.gz` sibling the client
+    accepts. Each encoding has its own ETag; hashed build files are immutable.
+    """
+    path = posixpath.normpath(path).lstrip('/')
+    full_path = _static_path(path)
+    content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+    immutable = bool(_IMMUTABLE_RE.search(path))
+    mtime = os.stat(full_path).st_mtime
+
+    served_path, headers = full_path, {}
+    for encoding in accepted_encodings(request):
+        sibling = f"{full_path}.{'br' if encoding == 'br' else 'gz'}"
+        try:
+            if os.stat(sibling).st_mtime >= mtime:
+                served_path, headers = sibling, {'Content-Encoding': encoding}
+                break
+        except OSError:
+            continue
+
+    response = serve_file(
+        request, served_path,
+        content_type=content_type,
+        immutable=immutable,
+        headers=headers,
+    )
+    if response.status_code == 304 and headers:
+        # Conditional responses must not claim an encoding for a body they do not send.
+        del response['Content-Encoding']
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+def compress_file(full_path, encodings=None, force=False):
+    """
+    Writes `.br`/`.gz` siblings for one file, skipping up-to-date ones and removing
+    any that would not be smaller. Returns the encodings written.
+    """
+    written = []
+    mtime = os.stat(full_path).st_mtime
+    data = None
+    for encoding in encodings or available_encodings():
+        sibling = f"{full_path}.{'br' if encoding == 'br' else 'gz'}"
+        if not force and os.path.exists(sibling) and os.stat(sibling).st_mtime >= mtime:
+            continue
+        if data is None:
+            with open(full_path, 'rb') as source:
+                data = source.read()
+        compressed = compress(data, encoding)
+        if len(compressed) >= len(data):
+            if os.path.exists(sibling):
+                os.remove(sibling)
+            continue
+        with open(sibling, 'wb') as target:
+            target.write(compressed)
+        written.append(encoding)
+    return written
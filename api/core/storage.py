@@ -0,0 +1,90 @@
+# core/storage.py
+
+import hashlib
+import os
+import re
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.core.files.utils import validate_file_name
+from django.db import transaction
+
+_SHARD_RE = re.compile(r'^[0-9a-f]{2}$')
+_HASHED_NAME_RE = re.compile(r'(^|/)([0-9a-f]{2})/([0-9a-f]{2})/(\2\3[0-9a-f]{60})(\.[^/]*)?$')
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Stores files under the SHA-256 of their content, sharded by hash prefix:
+    `uploads/storeitem/4f/a1/4fa1...c9.jpg`.
+
+    The directory given by `upload_to` is kept as the collection and the extension
+    is kept, but the rest of the requested name is ignored. Identical uploads thus
+    map to one file, which is written once and reference counted (core.models.StoredFile).
+    `delete()` drops a reference and removes the file only once the last one is gone
+    and the surrounding transaction has committed, so a rolled-back request never
+    loses a file. Files stored before content addressing are untracked and deleted
+    directly, as before.
+    """
+    hash_algorithm = 'sha256'
+
+    def __init__(self, **kwargs):
+        # The same name always means the same bytes, so rewriting a file is harmless.
+        kwargs.setdefault('allow_overwrite', True)
+        super().__init__(**kwargs)
+
+    def digest(self, content):
+        hasher = hashlib.new(self.hash_algorithm)
+        for chunk in content.chunks():
+            hasher.update(chunk)
+        if content.seekable():
+            content.seek(0)
+        return hasher.hexdigest()
+
+    def hashed_name(self, name, digest):
+        directory, basename = os.path.split(name.replace('\\', '/'))
+        parts = directory.split('/') if directory else []
+        # A name derived from a stored file (e.g. an image variant) stays in its collection.
+        if len(parts) >= 2 and _SHARD_RE.match(parts[-1]) and _SHARD_RE.match(parts[-2]):
+            parts = parts[:-2]
+        ext = os.path.splitext(basename)[1].lower()
+        return '/'.join([*parts, digest[:2], digest[2:4], f'{digest}{ext}'])
+
+    def is_hashed_name(self, name):
+        return bool(_HASHED_NAME_RE.search(name or ''))
+
+    def save(self, name, content, max_length=None):
+        from core.models import StoredFile
+
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, self.digest(content))
+        validate_file_name(name, allow_relative_path=True)
+        created = StoredFile.acquire(name)
+        if created or not self.exists(name):
+            self._save(name, content)
+        return name
+
+    def delete(self, name):
+        from core.models import StoredFile
+
+        if not name:
+            raise ValueError("The name must be given to delete().")
+        remaining = StoredFile.release(name)
+        if remaining is None:
+            super().delete(name)
+        elif remaining == 0:
+            transaction.on_commit(lambda: self.purge(name))
+
+    def purge(self, name):
+        """Removes `name` from disk if nothing references it any more."""
+        from core.models import StoredFile
+
+        with transaction.atomic():
+            record = StoredFile.objects.select_for_update().filter(name=name, references=0).first()
+            if record is None:
+                return # Referenced again in the meantime
+            super().delete(name)
+            record.delete()
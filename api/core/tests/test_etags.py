@@ -0,0 +1,89 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from core.models import VersionStamp
+from core.versioning import CATALOG, bump_school, school_key
+from store.models import StoreItem
+from users.models import School, User
+
+
+@override_settings(DATABASE_SHARD_URLS=[], DATABASE_ROUTERS=[])
+class ConditionalGetTests(TestCase):
+    """List and detail reads carry an ETag from version stamps and answer If-None-Match with 304."""
+    url = '/api/v1/students/profiles/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.school = School.objects.create(name='School', code='school')
+        cls.other_school = School.objects.create(name='Other school', code='other')
+        cls.teacher = User.objects.create(username='teacher', role=User.Role.TEACHER, is_staff=True, school=cls.school)
+        cls.student = User.objects.create(username='student', school=cls.school)
+        cls.other_student = User.objects.create(username='other-student', school=cls.other_school)
+
+    def setUp(self):
+        cache.clear() # Cached catalog pages outlive the stamps each test rolls back
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+
+    def get(self, url, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(url, **headers)
+
+    def test_unchanged_data_answers_304(self):
+        response = self.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+
+        response = self.get(self.url, etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(self.get(self.url, '*').status_code, 304)
+
+    def test_writes_change_the_etag_once_committed(self):
+        etag = self.get(self.url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/api/v1/students/profiles/{self.student.pk}/add-xp/', {'xpPoints': 5}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        response = self.get(self.url, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_bumps_wait_for_the_commit(self):
+        key = school_key(self.school.pk)
+        with self.captureOnCommitCallbacks() as callbacks, transaction.atomic():
+            bump_school(self.school.pk)
+            self.assertEqual(VersionStamp.current([key]), {key: 0})
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+        self.assertEqual(VersionStamp.current([key]), {key: 1})
+
+    def test_other_schools_writes_keep_the_etag(self):
+        etag = self.get(self.url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.other_student.student_profile.save()
+        self.assertEqual(self.get(self.url, etag).status_code, 304)
+
+    def test_etag_depends_on_the_user_and_path(self):
+        etag = self.get(self.url)['ETag']
+        self.assertEqual(self.get(f'{self.url}?page=1', etag).status_code, 200)
+        self.assertEqual(self.get(f'{self.url}{self.student.pk}/', etag).status_code, 200)
+
+        self.client.force_authenticate(User.objects.create(username='teacher-2', role=User.Role.TEACHER, school=self.school))
+        self.assertEqual(self.get(self.url, etag).status_code, 200)
+
+    def test_catalog_changes_change_the_etag(self):
+        url = '/api/v1/store/items/'
+        etag = self.get(url)['ETag']
+        self.assertEqual(self.get(url, etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            StoreItem.objects.create(name='Sticker', xp_cost=10, stock_quantity=5)
+        self.assertEqual(VersionStamp.current([CATALOG]), {CATALOG: 1})
+        response = self.get(url, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['name'] for item in response.json()['data']['items']], ['Sticker'])
@@ -0,0 +1,81 @@
+import base64
+import json
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from students.models import XpGrantLog
+from users.models import School, User
+
+
+def cursor(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+@override_settings(DATABASE_SHARD_URLS=[], DATABASE_ROUTERS=[])
+class KeysetPaginationTests(TestCase):
+    """`?cursor=` pages of the XP history seek past the previous page in (-date, -id) order."""
+    url = '/api/v1/students/xp-history/'
+
+    @classmethod
+    def setUpTestData(cls):
+        school = School.objects.create(name='School', code='school')
+        cls.teacher = User.objects.create(username='teacher', role=User.Role.TEACHER, is_staff=True, school=school)
+        student = User.objects.create(username='student', school=school)
+        logs = XpGrantLog.objects.bulk_create([
+            XpGrantLog(student=student, teacher=cls.teacher, amount=n + 1, school=school) for n in range(25)
+        ])
+        # Groups of three grants share a date, so pages must also seek on the id.
+        now = timezone.now()
+        for n, log in enumerate(logs):
+            log.date = now - timedelta(minutes=n // 3)
+        XpGrantLog.objects.bulk_update(logs, ['date'])
+        cls.expected = list(XpGrantLog.objects.order_by('-date', '-id').values_list('pk', flat=True))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()['data']
+        return [item['id'] for item in data['items']], data['pagination']
+
+    def test_next_and_previous_links(self):
+        ids, pagination = self.get(self.url, cursor='', pageSize=10)
+        pages = [ids]
+        self.assertNotIn('count', pagination)
+        self.assertIsNone(pagination['previousPage'])
+        while pagination['nextPage']:
+            ids, pagination = self.get(pagination['nextPage'])
+            pages.append(ids)
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        self.assertEqual([pk for page in pages for pk in page], self.expected)
+
+        for page in reversed(pages[:-1]):
+            ids, pagination = self.get(pagination['previousPage'])
+            self.assertEqual(ids, page)
+        self.assertIsNone(pagination['previousPage'])
+
+    def test_page_numbers_without_a_cursor(self):
+        ids, pagination = self.get(self.url, page=2, pageSize=10)
+        self.assertEqual(ids, self.expected[10:20])
+        self.assertEqual(pagination['count'], 25)
+
+    def test_invalid_cursors(self):
+        now = timezone.now().isoformat()
+        for token in [
+            'not a cursor',
+            base64.urlsafe_b64encode(b'[1, 2]').decode(),
+            cursor({'p': [now]}),
+            cursor({'p': [now, 1, 2]}),
+            cursor({'p': ['yesterday', 1]}),
+            cursor({'p': [now, 'one']}),
+            cursor({'p': [now, None]}),
+        ]:
+            with self.subTest(token=token):
+                response = self.client.get(self.url, {'cursor': token})
+                self.assertEqual(response.status_code, 404)
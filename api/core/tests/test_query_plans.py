@@ -0,0 +1,53 @@
+from unittest import skipUnless
+
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from core import queryplans
+
+
+# Plans are checked on the primary: keep every school (and id), and every read, on it.
+@skipUnless(queryplans.supported(), 'Query plans are only checked on SQLite and PostgreSQL.')
+@override_settings(DATABASE_SHARD_URLS=[], DATABASE_ROUTERS=[])
+class QueryPlanTests(TestCase):
+    """Each hot list endpoint's list query is served by an index: no sequential scan, no sort."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher, cls.student = queryplans.seed()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+
+    def assertServedByIndexes(self, name):
+        url, table = next((url, table) for case, url, table in queryplans.CASES if case == name)
+        for sql, details, problems in queryplans.list_query_plans(self.client, url.format(student=self.student.pk), table):
+            self.assertEqual(problems, [], f"{sql}\n" + '\n'.join(details))
+
+    def test_users(self):
+        self.assertServedByIndexes('users')
+
+    def test_students_by_xp(self):
+        self.assertServedByIndexes('students by XP')
+
+    def test_leaderboard(self):
+        self.assertServedByIndexes('leaderboard')
+
+    def test_leaderboard_page_3(self):
+        self.assertServedByIndexes('leaderboard, page 3')
+
+    def test_xp_history(self):
+        self.assertServedByIndexes('XP history')
+
+    def test_xp_history_keyset(self):
+        self.assertServedByIndexes('XP history, keyset')
+
+    def test_transactions(self):
+        self.assertServedByIndexes('transactions')
+
+    def test_transactions_keyset(self):
+        self.assertServedByIndexes('transactions, keyset')
+
+    def test_one_students_transactions(self):
+        self.assertServedByIndexes('one student\'s transactions')
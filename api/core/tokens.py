@@ -0,0 +1,76 @@
+# core/tokens.py
+
+"""
+Refresh-token rotation with a constant number of queries.
+
+simplejwt checks the blacklist with a join, then re-fetches the user twice and
+runs two get_or_create()s on every refresh. Here, the shared cache remembers
+rotated token ids until they expire, so a replayed token is refused without a query.
+Otherwise the old token is blacklisted by inserting its BlacklistedToken row: the
+unique constraint makes that insert the authoritative "already used?" check, so
+two concurrent refreshes with the same token cannot both succeed.
+"""
+
+from django.core.cache import cache
+from django.db import IntegrityError, router, transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import aware_utcnow, datetime_from_epoch
+
+BLACKLIST_CACHE_PREFIX = 'jwt-blacklisted'
+
+
+def _cache_key(jti):
+    return f'{BLACKLIST_CACHE_PREFIX}:{jti}'
+
+
+def remember_blacklisted(jti, exp):
+    """Caches a blacklisted token id until the token would have expired anyway."""
+    timeout = int((datetime_from_epoch(exp) - aware_utcnow()).total_seconds())
+    if timeout > 0:
+        cache.set(_cache_key(jti), True, timeout)
+
+
+class RotatingRefreshToken(RefreshToken):
+    """
+    A refresh token whose blacklist check happens in `rotate()`.
+    Only the cache is consulted when the token is decoded.
+    """
+    def check_blacklist(self):
+        if cache.get(_cache_key(self.payload[api_settings.JTI_CLAIM])):
+            raise TokenError(_("Token is blacklisted"))
+
+    def _outstanding_fields(self, user_id):
+        return {
+            'user_id': user_id,
+            'token': str(self),
+            'created_at': self.current_time,
+            'expires_at': datetime_from_epoch(self.payload['exp']),
+        }
+
+    def rotate(self, user_id, blacklist=True):
+        """
+        Blacklists this token (failing if it already was) and turns it into a new,
+        outstanding token with a fresh id and lifetime.
+        """
+        jti, exp = self.payload[api_settings.JTI_CLAIM], self.payload['exp']
+        using = router.db_for_write(OutstandingToken) # The user's school database (core.shards)
+        with transaction.atomic(using=using):
+            if blacklist:
+                outstanding, created = OutstandingToken.objects.get_or_create(jti=jti, defaults=self._outstanding_fields(user_id))
+                try:
+                    with transaction.atomic(using=using):
+                        BlacklistedToken.objects.create(token=outstanding)
+                except IntegrityError:
+                    remember_blacklisted(jti, exp)
+                    raise TokenError(_("Token is blacklisted"))
+
+            self.set_jti()
+            self.set_exp()
+            self.set_iat()
+            OutstandingToken.objects.create(jti=self.payload[api_settings.JTI_CLAIM], **self._outstanding_fields(user_id))
+        if blacklist:
+            remember_blacklisted(jti, exp)
@@ -0,0 +1,25 @@
+# core/validators.py
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.template.defaultfilters import filesizeformat
+
+from core import images
+
+
+def validate_image_upload(upload):
+    """
+    Refuses image uploads that exceed IMAGE_MAX_UPLOAD_BYTES, IMAGE_MAX_EDGE or
+    IMAGE_MAX_PIXELS, reading only the file size and the image header.
+    Files that are already stored are not re-checked.
+    """
+    if getattr(upload, '_committed', False):
+        return
+    if upload.size > settings.IMAGE_MAX_UPLOAD_BYTES:
+        raise ValidationError(
+            f"The file is {filesizeformat(upload.size)}; the limit is {filesizeformat(settings.IMAGE_MAX_UPLOAD_BYTES)}."
+        )
+    try:
+        images.probe(upload, settings.IMAGE_MAX_PIXELS, settings.IMAGE_MAX_EDGE)
+    except images.ImageRejected as exc:
+        raise ValidationError(str(exc))
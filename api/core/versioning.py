@@ -0,0 +1,63 @@
+# core/versioning.py
+
+"""
+Version stamps for the data served by the API.
+
+- The store catalog is shared by every school and has a single stamp.
+- Everything scoped to a school (students, XP, users, transactions) shares one stamp per school.
+
+Writers call `bump_*`; readers turn the current stamps into ETags or cache keys.
+A bump made inside a transaction is applied once it commits, so the shared stamp
+row is not locked for the rest of the transaction (which would serialize every
+writer of a school, or every purchase) and readers never see a new version
+before the data it stands for.
+"""
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from . import shards
+from .models import VersionStamp
+
+CATALOG = 'store-catalog'
+
+
+def school_key(school_id):
+    return f'school:{school_id}'
+
+
+def _bump_after_commit(key, using):
+    """Bumps `key` when the transaction open on `using` commits (right away outside one)."""
+    transaction.on_commit(lambda: VersionStamp.bump(key), using=using)
+
+
+def bump_catalog():
+    _bump_after_commit(CATALOG, DEFAULT_DB_ALIAS)
+
+
+def bump_school(school_id):
+    if school_id:
+        # A school's data is written on its own database (core.shards).
+        _bump_after_commit(school_key(school_id), shards.database_for_school(school_id))
+
+
+def current_versions(request, keys):
+    """
+    Current versions for `keys`, memoized on the request so the ETag check and
+    the response cache share a single query.
+    """
+    memo = request.__dict__.setdefault('_version_stamps', {})
+    missing = [key for key in keys if key not in memo]
+    if missing:
+        memo.update(VersionStamp.current(missing))
+    return {key: memo[key] for key in keys}
+
+
+def scope_keys(scopes, user):
+    """Maps view scopes ('catalog', 'school') to the stamp keys that apply to `user`."""
+    keys = []
+    for scope in scopes:
+        if scope == 'catalog':
+            keys.append(CATALOG)
+        elif scope == 'school':
+            keys.append(school_key(getattr(user, 'school_id', None)))
+    return keys
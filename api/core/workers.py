@@ -0,0 +1,102 @@
+# core/workers.py
+
+"""
+A small, bounded process pool for CPU-heavy work that must not run inside a request
+(e.g. image encoding).
+
+Jobs are plain module-level functions taking and returning picklable values. The
+result is handed to a callback in this process, which is where anything touching the
+database or storage belongs. At most WORKER_PROCESSES jobs run at once and at most
+WORKER_MAX_PENDING_JOBS are accepted; beyond that `submit()` returns False so the
+caller can leave the job for a management command to pick up.
+"""
+
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_local = threading.local()
+_executor = None
+_slots = None
+
+
+def _get_executor(reset=False):
+    global _executor, _slots
+    with _lock:
+        if reset and _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+        if _executor is None:
+            # 'spawn' keeps the workers free of the parent's threads and open connections.
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.WORKER_PROCESSES,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        if _slots is None:
+            _slots = threading.BoundedSemaphore(settings.WORKER_MAX_PENDING_JOBS)
+        return _executor
+
+
+def _done(callback, future):
+    try:
+        callback(future)
+    except Exception:
+        logger.exception("Worker callback %r failed", callback)
+    finally:
+        _slots.release()
+        # Callbacks normally run on the pool's management thread, which must not keep
+        # database connections open. A job that finished before its callback was
+        # attached runs the callback on the submitting thread instead; leave that alone.
+        if not getattr(_local, 'submitting', False):
+            connections.close_all()
+
+
+def submit(fn, *args, callback):
+    """
+    Runs `fn(*args)` in a worker process and calls `callback(future)` with the result.
+    Returns False, without running anything, when the pool is saturated.
+    """
+    executor = _get_executor()
+    if not _slots.acquire(blocking=False):
+        return False
+    _local.submitting = True
+    try:
+        try:
+            future = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); start a fresh pool once.
+            future = _get_executor(reset=True).submit(fn, *args)
+        future.add_done_callback(lambda future: _done(callback, future))
+    except Exception:
+        _slots.release()
+        raise
+    finally:
+        _local.submitting = False
+    return True
+
+
+def worker_count():
+    return max(1, settings.WORKER_PROCESSES)
+
+
+def run_batch(fn, argument_tuples):
+    """
+    Runs `fn(*args)` for each tuple in the pool and waits for all of them, returning
+    the results in order. For batch work (commands, imports) whose caller needs the
+    results; it bypasses the pending-job limit of `submit()`.
+    """
+    argument_tuples = list(argument_tuples)
+    try:
+        futures = [_get_executor().submit(fn, *args) for args in argument_tuples]
+        return [future.result() for future in futures]
+    except BrokenProcessPool:
+        futures = [_get_executor(reset=True).submit(fn, *args) for args in argument_tuples]
+        return [future.result() for future in futures]
@@ -1,14 +1,108 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_vary_headers
+
+from core import shards
+from dev_xp_camp import routers
+
+REPLICA_PIN_COOKIE = 'db_pin'
+
+
 class NoCacheMiddleware:
+    """
+    Sets caching headers on API responses.
+    Responses carrying an ETag may be stored privately but must be revalidated on every
+    use (`private, no-cache`), so clients get cheap 304s without ever seeing stale data.
+    Everything else is never stored.
+    """
     def __init__(self, get_response):
         self.get_response = get_response
 
     def __call__(self, request):
         response = self.get_response(request)
         
-        # Add no-cache headers to API responses
         if request.path.startswith('/api/'):
-            response['Cache-Control'] = 'no-cache, no-store, must-revalidate'
-            response['Pragma'] = 'no-cache'
-            response['Expires'] = '0'
+            if response.has_header('ETag'):
+                response['Cache-Control'] = 'private, no-cache'
+                # Responses differ per user, which is identified by the Authorization header.
+                patch_vary_headers(response, ('Authorization',))
+            else:
+                # Add no-cache headers to API responses
+                response['Cache-Control'] = 'no-cache, no-store, must-revalidate'
+                response['Pragma'] = 'no-cache'
+                response['Expires'] = '0'
             
-        return response
\ No newline at end of file
+        return response
+
+
+class ReplicaPinMiddleware:
+    """
+    Routes the reads of safe requests to a read replica (dev_xp_camp.routers), except
+    for clients that wrote within the last REPLICA_PIN_SECONDS.
+
+    A request that writes pins its client to the primary twice over: with a cookie
+    holding the pin's expiry, for browsers, and in the shared cache under a hash of its
+    credentials (Authorization header or session cookie), for API clients that do not
+    keep cookies.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not routers.replica_aliases():
+            return self.get_response(request)
+
+        client = self.client_key(request)
+        safe = request.method in ('GET', 'HEAD', 'OPTIONS')
+        token = routers.begin_request(safe and not self.is_pinned(request, client))
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = routers.end_request(token)
+
+        if wrote:
+            seconds = settings.REPLICA_PIN_SECONDS
+            response.set_cookie(
+                REPLICA_PIN_COOKIE, str(int(time.time() + seconds)),
+                max_age=seconds, httponly=True, samesite='Lax', secure=request.is_secure(),
+            )
+            if client:
+                cache.set(client, True, seconds)
+        return response
+
+    def client_key(self, request):
+        credentials = request.META.get('HTTP_AUTHORIZATION') or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+        if not credentials:
+            return None
+        return 'db-pin:' + hashlib.sha256(credentials.encode()).hexdigest()
+
+    def is_pinned(self, request, client):
+        try:
+            if int(request.COOKIES.get(REPLICA_PIN_COOKIE, 0)) > time.time():
+                return True
+        except ValueError:
+            pass
+        return bool(client and cache.get(client))
+
+
+class SchoolShardMiddleware:
+    """
+    Scopes the school that school data is routed to (core.shards) to the request.
+    Authentication sets it once the user is known; before that, school data is
+    read from `default`.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not shards.enabled():
+            return self.get_response(request)
+
+        token = shards.begin_request()
+        try:
+            return self.get_response(request)
+        finally:
+            shards.end_request(token)
@@ -0,0 +1,96 @@
+"""
+Database routing.
+
+ShardRouter sends school data to the database of its school (see core.shards).
+
+When DATABASE_REPLICA_URLS names replicas of `default`, ReplicaRouter sends the reads
+of safe (GET/HEAD/OPTIONS) requests to one of them, chosen once per request. Every
+write, every read of an unsafe request, every read inside a transaction and
+everything outside a request (commands, workers) uses `default`.
+
+After a client writes, ReplicaPinMiddleware (dev_xp_camp.middleware) pins its
+reads to `default` for REPLICA_PIN_SECONDS so it sees its own changes while the
+replicas catch up.
+"""
+
+import contextvars
+import random
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core import shards
+
+REPLICA_PREFIX = 'replica'
+
+
+class RoutingState:
+    """How the current request reads: from `replica` (an alias, or None for default)."""
+    def __init__(self, replica):
+        self.replica = replica
+        self.wrote = False
+
+
+_state = contextvars.ContextVar('db_routing_state', default=None)
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith(REPLICA_PREFIX)]
+
+
+def begin_request(use_replica):
+    """Starts routing for a request. Returns a token for `end_request()`."""
+    aliases = replica_aliases() if use_replica else []
+    return _state.set(RoutingState(random.choice(aliases) if aliases else None))
+
+
+def end_request(token):
+    """Ends routing for a request. Returns True if it wrote to the database."""
+    state = _state.get()
+    _state.reset(token)
+    return bool(state and state.wrote)
+
+
+class ShardRouter:
+    """
+    Sends school data to the database of its school (core.shards). Anything on
+    `default` is left to the next router.
+    """
+    def db_for_read(self, model, **hints):
+        return self._route(model, hints, write=False)
+
+    def db_for_write(self, model, **hints):
+        return self._route(model, hints, write=True)
+
+    def _route(self, model, hints, write):
+        if not shards.enabled() or not shards.is_sharded(model):
+            return None
+        database = shards.route(model, hints.get('instance'), write=write)
+        return None if database == DEFAULT_DB_ALIAS else database
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Shared rows are copied to every shard.
+        if shards.is_replicated(type(obj1)) or shards.is_replicated(type(obj2)):
+            return True
+        return None
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state.replica is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        aliases = set(settings.DATABASES)
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
@@ -54,6 +54,8 @@ MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'dev_xp_camp.middleware.NoCacheMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'dev_xp_camp.middleware.ReplicaPinMiddleware',
+    'dev_xp_camp.middleware.SchoolShardMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -70,7 +72,7 @@ CORS_ALLOW_CREDENTIALS = True
 # Configure Django REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.authentication.CachedJWTAuthentication',
     ),
     # Use our custom renderer and the drf-camel-case parser
     'DEFAULT_RENDERER_CLASSES': (
@@ -94,13 +96,21 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Logins update last_login in batches (users.logins): at most FLUSH_INTERVAL seconds
+# later, or once BATCH_SIZE logins are waiting. When off, every login writes its row.
+LAST_LOGIN_BUFFERED = config('LAST_LOGIN_BUFFERED', default=True, cast=bool)
+LAST_LOGIN_FLUSH_INTERVAL = config('LAST_LOGIN_FLUSH_INTERVAL', default=5, cast=float)
+LAST_LOGIN_BATCH_SIZE = config('LAST_LOGIN_BATCH_SIZE', default=200, cast=int)
+
 # Configure Simple JWT for authentication
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=config('JWT_ACCESS_TOKEN_LIFETIME_DAYS', default=1, cast=int)),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=config('JWT_REFRESH_TOKEN_LIFETIME_DAYS', default=7, cast=int)),
     'ROTATE_REFRESH_TOKENS': True, # Generates a new refresh token when you use one
     'BLACKLIST_AFTER_ROTATION': True,
-    'UPDATE_LAST_LOGIN': True,
+    'UPDATE_LAST_LOGIN': not LAST_LOGIN_BUFFERED,
+    # Rotation blacklists the used token with a single insert, fronted by the cache (core.tokens).
+    'TOKEN_REFRESH_SERIALIZER': 'users.serializers.MyTokenRefreshSerializer',
 
     'ALGORITHM': 'HS256',
     'SIGNING_KEY': SECRET_KEY,
@@ -124,6 +134,11 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
 }
 
+# Authenticated users are cached per process (core.authentication). Saves invalidate the
+# entry immediately in the saving process and within the TTL (seconds) everywhere else.
+AUTH_USER_CACHE_SIZE = config('AUTH_USER_CACHE_SIZE', default=1024, cast=int)
+AUTH_USER_CACHE_TTL = config('AUTH_USER_CACHE_TTL', default=30, cast=int)
+
 ROOT_URLCONF = 'dev_xp_camp.urls'
 
 TEMPLATES = [
@@ -150,11 +165,103 @@ WSGI_APPLICATION = 'dev_xp_camp.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Connections are kept open between requests for DATABASE_CONN_MAX_AGE seconds (0: one
+# per request) and checked before reuse. On PostgreSQL, DATABASE_POOL uses
+# psycopg's pool instead (needs `psycopg[pool]`): each worker process keeps between
+# DATABASE_POOL_MIN_SIZE and DATABASE_POOL_MAX_SIZE connections per database, and a request
+# waits up to DATABASE_POOL_TIMEOUT seconds for one. Keep workers x max size under the
+# server's max_connections. `GET /api/v1/system/databases/` shows how the pools are used.
+DATABASE_CONN_MAX_AGE = config('DATABASE_CONN_MAX_AGE', default=60, cast=int)
+DATABASE_CONN_HEALTH_CHECKS = config('DATABASE_CONN_HEALTH_CHECKS', default=True, cast=bool)
+DATABASE_POOL = config('DATABASE_POOL', default=False, cast=bool)
+DATABASE_POOL_MIN_SIZE = config('DATABASE_POOL_MIN_SIZE', default=2, cast=int)
+DATABASE_POOL_MAX_SIZE = config('DATABASE_POOL_MAX_SIZE', default=4, cast=int)
+DATABASE_POOL_TIMEOUT = config('DATABASE_POOL_TIMEOUT', default=10, cast=float)
+
+
+def database_config(url, **extra):
+    """Parses a database URL (dj-database-url) and applies the connection settings above."""
+    database = dj_database_url.parse(
+        url, conn_max_age=DATABASE_CONN_MAX_AGE, conn_health_checks=DATABASE_CONN_HEALTH_CHECKS,
+    )
+    if DATABASE_POOL and database['ENGINE'] == 'django.db.backends.postgresql':
+        database['CONN_MAX_AGE'] = 0 # Connections go back to the pool instead
+        database['OPTIONS'] = {**database.get('OPTIONS', {}), 'pool': {
+            'min_size': DATABASE_POOL_MIN_SIZE,
+            'max_size': DATABASE_POOL_MAX_SIZE,
+            'timeout': DATABASE_POOL_TIMEOUT,
+        }}
+    return {**database, **extra}
+
+
 # Use dj-database-url to parse DATABASE_URL from environment
 DATABASES = {
-    'default': dj_database_url.config(default=config('DATABASE_URL'))
+    'default': database_config(config('DATABASE_URL'))
 }
 
+# Optional read replicas, comma-separated URLs (aliases replica1, replica2, ...). Reads of
+# GET requests go to one of them (dev_xp_camp.routers); a client that writes reads from the
+# primary for REPLICA_PIN_SECONDS. Tests read from the primary instead.
+DATABASE_REPLICA_URLS = [url.strip() for url in config('DATABASE_REPLICA_URLS', default='').split(',') if url.strip()]
+for number, url in enumerate(DATABASE_REPLICA_URLS, start=1):
+    DATABASES[f'replica{number}'] = database_config(url, TEST={'MIRROR': 'default'})
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=5, cast=int)
+
+# Optional school shards, comma-separated URLs (aliases shard1, shard2, ...). Each school's
+# users, students, XP history and transactions live on the database in School.database
+# (core.shards); shared tables stay on `default`. Move a school with `manage.py move_school`.
+DATABASE_SHARD_URLS = [url.strip() for url in config('DATABASE_SHARD_URLS', default='').split(',') if url.strip()]
+for number, url in enumerate(DATABASE_SHARD_URLS, start=1):
+    DATABASES[f'shard{number}'] = database_config(url)
+# How long a process trusts its copy of where each school lives (and whether it is moving).
+SHARD_MAP_TTL = config('SHARD_MAP_TTL', default=10, cast=int)
+
+DATABASE_ROUTERS = ['dev_xp_camp.routers.ShardRouter', 'dev_xp_camp.routers.ReplicaRouter']
+AUTHENTICATION_BACKENDS = ['users.backends.ShardedModelBackend']
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Works with the local-memory (default) or file backend, e.g.
+# CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache CACHE_LOCATION=/var/tmp/dev_xp_cache
+
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='dev-xp-camp'),
+    }
+}
+
+# How long a cached list page (e.g. the store catalog) is kept. Entries are keyed by
+# version stamps, so this only bounds memory/disk use, never staleness.
+LIST_CACHE_TIMEOUT = config('LIST_CACHE_TIMEOUT', default=3600, cast=int)
+
+
+# Search
+# `?search=` on users, students, XP logs and transactions is answered from core.search's
+# index (pg_trgm on PostgreSQL, FTS5 on SQLite). False falls back to icontains predicates.
+SEARCH_INDEX_ENABLED = config('SEARCH_INDEX_ENABLED', default=True, cast=bool)
+
+
+# Background work
+# Store item images are rendered off-request: 'process' uses the worker pool below,
+# 'sync' renders inline (development), 'deferred' leaves them to `manage.py process_store_images`.
+
+IMAGE_PROCESSING_MODE = config('IMAGE_PROCESSING_MODE', default='process')
+WORKER_PROCESSES = config('WORKER_PROCESSES', default=2, cast=int)
+WORKER_MAX_PENDING_JOBS = config('WORKER_MAX_PENDING_JOBS', default=16, cast=int)
+
+# Image uploads are checked against these limits from their header, before any decoding.
+IMAGE_MAX_UPLOAD_BYTES = config('IMAGE_MAX_UPLOAD_BYTES', default=20 * 1024 * 1024, cast=int)
+IMAGE_MAX_PIXELS = config('IMAGE_MAX_PIXELS', default=50_000_000, cast=int)
+IMAGE_MAX_EDGE = config('IMAGE_MAX_EDGE', default=12_000, cast=int)
+# Report cards are re-encoded as JPEG with their longest edge capped at this size.
+REPORT_CARD_MAX_EDGE = config('REPORT_CARD_MAX_EDGE', default=2400, cast=int)
+
+# Roster imports (users.roster) hash their passwords across the worker pool above.
+ROSTER_MAX_ROWS = config('ROSTER_MAX_ROWS', default=5000, cast=int)
+ROSTER_MAX_UPLOAD_BYTES = config('ROSTER_MAX_UPLOAD_BYTES', default=2 * 1024 * 1024, cast=int)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -190,6 +297,23 @@ USE_TZ = True
 MEDIA_URL = config('MEDIA_URL', default='')
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# How uploads are served outside DEBUG (see core.media): 'django' streams them with
+# wsgi.file_wrapper/sendfile, 'x-accel-redirect' (nginx) and 'x-sendfile' (Apache,
+# lighttpd) hand the transfer to the front proxy. For nginx, map the prefix to MEDIA_ROOT
+# in an `internal` location.
+MEDIA_SERVE_MODE = config('MEDIA_SERVE_MODE', default='django')
+MEDIA_ACCEL_REDIRECT_PREFIX = config('MEDIA_ACCEL_REDIRECT_PREFIX', default='/protected-media/')
+
+# Uploads are stored by content hash with shared, reference-counted copies (see core.storage).
+STORAGES = {
+    'default': {
+        'BACKEND': config('MEDIA_STORAGE_BACKEND', default='core.storage.ContentAddressedStorage'),
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
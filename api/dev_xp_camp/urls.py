@@ -1,14 +1,17 @@
 # config/urls.py
 
+import re
+
 from django.contrib import admin
 from django.conf import settings
 from django.urls import path, include, re_path
-from django.views.static import serve
 from rest_framework_simplejwt.views import (
     TokenRefreshView,
 )
 from django.conf.urls.static import static
-from django.views.generic import TemplateView
+from core.dbpools import DatabaseStatusView
+from core.media import serve_media
+from core.spa import serve_static, spa_shell
 from users.views import MyTokenObtainPairView
 
 urlpatterns = [
@@ -29,6 +32,9 @@ urlpatterns = [
         
         # Includes store item management and transactions
         path('store/', include('store.urls')),
+
+        # Connection and pool figures of the answering worker (admins only)
+        path('system/databases/', DatabaseStatusView.as_view(), name='database-status'),
     ])),
 ]
 
@@ -36,13 +42,13 @@ if settings.DEBUG:
     # Serve media files in development
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
 else:
-    # Serve media files in production (NOT RECOMMENDED)
+    # Serve media files in production, handing off to the proxy per MEDIA_SERVE_MODE
     urlpatterns += [
-        re_path(r'^(?P<path>uploads/.*)$', serve, {
-            'document_root': settings.MEDIA_ROOT,
-        })
+        re_path(r'^(?P<path>uploads/.*)$', serve_media),
+        # The Vite build, precompressed by `manage.py compress_static`
+        re_path(r'^%s(?P<path>.*)$' % re.escape(settings.STATIC_URL.lstrip('/')), serve_static),
     ]
 
 urlpatterns += [
-  re_path(r'^.*$', TemplateView.as_view(template_name="index.html"), name='react_app'),
+  re_path(r'^.*$', spa_shell, name='react_app'),
 ]
\ No newline at end of file
@@ -6,4 +6,5 @@ def get_upload_path(instance, filename):
     ext = filename.split('.')[-1]
     filename = f'{uuid.uuid4()}.{ext}'
     # This will return a path like 'uploads/model_name/the_uuid.ext'
+    # (core.storage.ContentAddressedStorage keeps only the directory and the extension)
     return os.path.join('uploads', instance.__class__.__name__.lower(), filename)
\ No newline at end of file
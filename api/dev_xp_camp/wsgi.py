@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'dev_xp_camp.settings')
 
 application = get_wsgi_application()
+
+# Render the SPA shell now rather than on the first navigation.
+from core.spa import warm_shell # noqa: E402
+
+warm_shell()
@@ -4,3 +4,14 @@ from django.apps import AppConfig
 class StoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'store'
+
+    def ready(self):
+        from core import search, shards
+        from .models import StoreItem, Transaction
+        shards.replicate(StoreItem)
+        shards.register(Transaction)
+        search.register(
+            Transaction,
+            ['student__username', 'item__name'],
+            follow={'users.User': ['student'], 'store.StoreItem': ['item']},
+        )
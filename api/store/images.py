@@ -0,0 +1,121 @@
+# store/images.py
+
+"""
+Off-request processing of store item images.
+
+An upload is stored as-is and the item is saved with `image_status='pending'`. Once
+the transaction commits, the original is rendered into responsive variants
+(core.images.VARIANT_SIZES, in JPEG and WebP) by the worker pool, or inline, or
+left for the `process_store_images` command, depending on IMAGE_PROCESSING_MODE.
+The rendered files are then saved next to the original and recorded in
+`image_variants`, and the status becomes 'ready' (or 'failed', which is logged).
+"""
+
+import logging
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from core import images, workers
+from core.versioning import bump_catalog
+from .models import StoreItem
+
+logger = logging.getLogger(__name__)
+
+
+def variant_path(source_name, variant, fmt):
+    """uploads/storeitem/<uuid>.png -> uploads/storeitem/<uuid>_card.webp"""
+    return f'{os.path.splitext(source_name)[0]}_{variant}.{fmt}'
+
+
+def variant_paths(variants):
+    return [entry[fmt] for entry in (variants or {}).values() for fmt in images.FORMATS if entry.get(fmt)]
+
+
+def delete_variants(variants):
+    for path in variant_paths(variants):
+        default_storage.delete(path)
+
+
+def _read_source(item_id):
+    """The current image name and contents of an item, or (None, None) if it has none."""
+    source_name = StoreItem.objects.filter(pk=item_id).values_list('image', flat=True).first()
+    if not source_name:
+        return None, None
+    with default_storage.open(source_name, 'rb') as source:
+        return source_name, source.read()
+
+
+def _mark_failed(item_id, source_name):
+    if StoreItem.objects.filter(pk=item_id, image=source_name).update(image_status=StoreItem.ImageStatus.FAILED):
+        bump_catalog()
+
+
+def _store_variants(item_id, source_name, rendered):
+    """Saves rendered variants and records them, unless the image was replaced meanwhile."""
+    old_variants = StoreItem.objects.filter(pk=item_id, image=source_name).values_list('image_variants', flat=True).first()
+    variants = {}
+    for name, variant in rendered.items():
+        entry = {'width': variant['width'], 'height': variant['height']}
+        for fmt in images.FORMATS:
+            entry[fmt] = default_storage.save(variant_path(source_name, name, fmt), ContentFile(variant[fmt]))
+        variants[name] = entry
+
+    updated = StoreItem.objects.filter(pk=item_id, image=source_name).update(
+        image_status=StoreItem.ImageStatus.READY, image_variants=variants
+    )
+    if not updated:
+        # The item was deleted or got a new image while we were rendering.
+        delete_variants(variants)
+        return
+    # Every save above took its own reference, so the old ones are always released,
+    # even when re-rendering produced the very same (content-addressed) files.
+    delete_variants(old_variants)
+    bump_catalog() # update() sends no signals
+
+
+def _finish(item_id, source_name, future):
+    try:
+        rendered = future.result()
+    except Exception:
+        logger.exception("Rendering the image of store item %s (%s) failed", item_id, source_name)
+        _mark_failed(item_id, source_name)
+        return
+    _store_variants(item_id, source_name, rendered)
+
+
+def process(item_id):
+    """Renders an item's image inline. Returns True on success."""
+    source_name, data = _read_source(item_id)
+    if source_name is None:
+        return False
+    try:
+        rendered = images.render_variants(data)
+    except Exception:
+        logger.exception("Rendering the image of store item %s (%s) failed", item_id, source_name)
+        _mark_failed(item_id, source_name)
+        return False
+    _store_variants(item_id, source_name, rendered)
+    return True
+
+
+def schedule(item_id):
+    """Starts processing a freshly uploaded image according to IMAGE_PROCESSING_MODE."""
+    mode = settings.IMAGE_PROCESSING_MODE
+    if mode == 'sync':
+        process(item_id)
+        return
+    if mode != 'process':
+        return # 'deferred': left for `manage.py process_store_images`
+
+    source_name, data = _read_source(item_id)
+    if source_name is None:
+        return
+    submitted = workers.submit(
+        images.render_variants, data,
+        callback=lambda future: _finish(item_id, source_name, future),
+    )
+    if not submitted:
+        logger.warning("Image workers are busy; store item %s stays pending", item_id)
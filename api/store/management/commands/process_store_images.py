@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from store import images
+from store.models import StoreItem
+
+class Command(BaseCommand):
+    help = 'Render the responsive variants of pending (or all) store item images.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--failed', action='store_true', help='Also retry images that failed before.')
+        parser.add_argument('--all', action='store_true', help='Re-render every image, including ready ones.')
+
+    def handle(self, *args, **options):
+        items = StoreItem.objects.exclude(image__isnull=True).exclude(image='')
+        if not options['all']:
+            statuses = [StoreItem.ImageStatus.PENDING]
+            if options['failed']:
+                statuses.append(StoreItem.ImageStatus.FAILED)
+            items = items.filter(image_status__in=statuses)
+
+        done = failed = 0
+        for item_id in items.values_list('pk', flat=True).iterator():
+            if images.process(item_id):
+                done += 1
+            else:
+                failed += 1
+                self.stderr.write(f'Store item {item_id}: rendering failed (see the log).')
+        self.stdout.write(self.style.SUCCESS(f'{done} image(s) processed, {failed} failed.'))
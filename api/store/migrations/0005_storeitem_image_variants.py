@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2026-10-17 20:52
+
+from django.db import migrations, models
+
+
+def mark_existing_images_pending(apps, schema_editor):
+    # Existing images get their variants from `manage.py process_store_images`.
+    StoreItem = apps.get_model('store', 'StoreItem')
+    StoreItem.objects.exclude(image__isnull=True).exclude(image='').update(image_status='pending')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0004_remove_storeitem_school'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storeitem',
+            name='image_status',
+            field=models.CharField(choices=[('none', 'No image'), ('pending', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], default='none', editable=False, max_length=10),
+        ),
+        migrations.AddField(
+            model_name='storeitem',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Rendered responsive variants of the image, by name and format.'),
+        ),
+        migrations.RunPython(mark_existing_images_pending, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.4 on 2026-10-17 20:55
+
+import core.validators
+import dev_xp_camp.utils
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0005_storeitem_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='storeitem',
+            name='image',
+            field=models.FileField(blank=True, null=True, upload_to=dev_xp_camp.utils.get_upload_path, validators=[core.validators.validate_image_upload]),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-17 21:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0007_alter_storeitem_image'),
+        ('users', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['school', '-timestamp', '-id'], name='store_txn_school_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['student', '-timestamp', '-id'], name='store_txn_student_time_idx'),
+        ),
+    ]
@@ -1,13 +1,13 @@
-import os
 from django.core.files.storage import default_storage
-from django.db import models
+from django.db import models, router, transaction
 from django.conf import settings
 from django.utils.translation import gettext_lazy as _
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from dev_xp_camp.utils import get_upload_path
-from io import BytesIO
-from django.core.files.base import ContentFile
-from PIL import Image as PilImage
-import uuid
+from core.shards import GlobalIdManager, GlobalIdModel
+from core.validators import validate_image_upload
+from core.versioning import bump_catalog, bump_school
 
 def store_image_upload_path(instance, filename):
     """Generates a unique path for uploaded store item images."""
@@ -22,8 +22,23 @@ class StoreItem(models.Model):
     description = models.TextField(blank=True)
     xp_cost = models.PositiveIntegerField(help_text=_("The price of the item in XP."))
     
+    class ImageStatus(models.TextChoices):
+        NONE = 'none', _('No image')
+        PENDING = 'pending', _('Processing')
+        READY = 'ready', _('Ready')
+        FAILED = 'failed', _('Failed')
+
     # Using FileField as requested, to handle blobs or any file type from the frontend.
-    image = models.FileField(upload_to=get_upload_path, null=True, blank=True)
+    image = models.FileField(
+        upload_to=get_upload_path, max_length=255, null=True, blank=True, validators=[validate_image_upload]
+    )
+    image_status = models.CharField(
+        max_length=10, choices=ImageStatus.choices, default=ImageStatus.NONE, editable=False
+    )
+    image_variants = models.JSONField(
+        default=dict, blank=True, editable=False,
+        help_text=_("Rendered responsive variants of the image, by name and format.")
+    )
     
     stock_quantity = models.PositiveIntegerField(default=1)
     is_active = models.BooleanField(
@@ -42,36 +57,107 @@ class StoreItem(models.Model):
         verbose_name_plural = _("Store Items")
 
     def save(self, *args, **kwargs):
-        # Delete old file if updating the image
+        from . import images
+
+        # Delete old files if updating the image
         if self.pk:
-            old = StoreItem.objects.filter(pk=self.pk).first()
+            old = StoreItem.objects.filter(pk=self.pk).only('image', 'image_variants').first()
             if old and old.image and self.image != old.image:
                 if default_storage.exists(old.image.name):
                     default_storage.delete(old.image.name)
-        # Image compression logic
-        if self.image and hasattr(self.image.file, 'content_type'):
-            try:
-                img = PilImage.open(self.image)
-                if img.mode != 'RGB':
-                    img = img.convert('RGB')
-                buffer = BytesIO()
-                img.save(buffer, format='JPEG', quality=85, optimize=True)
-                model_name = self.__class__.__name__.lower()
-                new_filename = f'{uuid.uuid4()}.jpg'
-                path = os.path.join('uploads', model_name, new_filename)
-                self.image.save(path, ContentFile(buffer.getvalue()), save=False)
-            except Exception:
-                pass
+                images.delete_variants(old.image_variants)
+        # A fresh upload is stored as-is; the variants are rendered off-request.
+        uploaded = bool(self.image) and not self.image._committed
+        if uploaded:
+            self.image_status = self.ImageStatus.PENDING
+            self.image_variants = {}
+        elif not self.image:
+            self.image_status = self.ImageStatus.NONE
+            self.image_variants = {}
         super().save(*args, **kwargs)
+        if uploaded:
+            item_id = self.pk
+            transaction.on_commit(lambda: images.schedule(item_id))
 
     def delete(self, *args, **kwargs):
-        # Delete the file from storage when the object is deleted
+        from . import images
+
+        # Delete the files from storage when the object is deleted
         if self.image and default_storage.exists(self.image.name):
             default_storage.delete(self.image.name)
+        images.delete_variants(self.image_variants)
         super().delete(*args, **kwargs)
 
 
-class Transaction(models.Model):
+class PurchaseError(Exception):
+    """
+    Raised when a purchase cannot be completed.
+    The message is safe to show to the user.
+    """
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class TransactionManager(GlobalIdManager):
+    """
+    Manager for Transaction, including the purchase logic.
+    """
+    def purchase(self, student_id, item_id, school_id):
+        """
+        Buys one unit of an item for a student.
+
+        Stock and XP are taken with conditional UPDATEs (`stock_quantity > 0`,
+        `available_xp >= cost`) so concurrent purchases can never oversell an item
+        or spend the same XP twice. The affected row counts decide success; if
+        either guard fails, the whole purchase is rolled back. The stock UPDATE also
+        checks that the price is still the one read first, so the XP debited is the
+        price the item had when its unit was reserved (a repriced item fails with 409).
+        """
+        from students.models import StudentProfile
+
+        xp_cost = StoreItem.objects.filter(pk=item_id).values_list('xp_cost', flat=True).first()
+        if xp_cost is None:
+            raise PurchaseError("Store item not found.", status_code=404)
+
+        # Stock lives on the global database, XP and the record on the school's (core.shards).
+        # The school's transaction is the outer one, so if only one of the two commits,
+        # it is the stock reservation: a unit may be lost, but XP is never taken for nothing.
+        school_database, global_database = router.db_for_write(Transaction), router.db_for_write(StoreItem)
+        with transaction.atomic(using=school_database), transaction.atomic(using=global_database):
+            reserved = StoreItem.objects.filter(
+                pk=item_id, xp_cost=xp_cost, is_active=True, stock_quantity__gt=0
+            ).update(stock_quantity=models.F('stock_quantity') - 1)
+            if not reserved:
+                current = (
+                    StoreItem.objects.filter(pk=item_id, is_active=True, stock_quantity__gt=0)
+                    .values_list('xp_cost', flat=True).first()
+                )
+                if current is not None and current != xp_cost:
+                    # Repriced since it was read: let the buyer confirm the new price.
+                    raise PurchaseError("The price of this item has changed. Please review it and try again.", status_code=409)
+                raise PurchaseError("This item is no longer available.")
+
+            debited = StudentProfile.objects.filter(
+                pk=student_id, school_id=school_id, available_xp__gte=xp_cost
+            ).update(available_xp=models.F('available_xp') - xp_cost)
+            if not debited:
+                # Raising rolls back the stock reservation as well.
+                if not StudentProfile.objects.filter(pk=student_id, school_id=school_id).exists():
+                    raise PurchaseError("Student not found.", status_code=404)
+                raise PurchaseError("Student does not have enough available XP.")
+
+            # Stock changed through update(), which sends no signals.
+            bump_catalog()
+            return self.create(
+                student_id=student_id,
+                item_id=item_id,
+                xp_cost_at_purchase=xp_cost,
+                school_id=school_id
+            )
+
+
+class Transaction(GlobalIdModel):
     """
     Logs every purchase made by a student, creating an immutable record.
     """
@@ -95,10 +181,31 @@ class Transaction(models.Model):
         related_name='transactions',
     )
 
+    objects = TransactionManager()
+
     def __str__(self):
         return f"Transaction: {self.student.username} bought {self.item.name} on {self.timestamp.strftime('%Y-%m-%d')}"
 
     class Meta:
         ordering = ['-timestamp']
         verbose_name = _("Transaction")
-        verbose_name_plural = _("Transactions")
\ No newline at end of file
+        verbose_name_plural = _("Transactions")
+        indexes = [
+            # A school's log, and one student's purchases, newest first (also the keyset order).
+            models.Index(fields=['school', '-timestamp', '-id'], name='store_txn_school_time_idx'),
+            models.Index(fields=['student', '-timestamp', '-id'], name='store_txn_student_time_idx'),
+        ]
+
+
+@receiver(post_save, sender=StoreItem)
+@receiver(post_delete, sender=StoreItem)
+def bump_catalog_version(sender, instance, **kwargs):
+    """Invalidates ETags for the shared store catalog."""
+    bump_catalog()
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+def bump_transaction_school_version(sender, instance, **kwargs):
+    """Invalidates ETags for the school whose transaction log changed."""
+    bump_school(instance.school_id)
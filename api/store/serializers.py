@@ -1,20 +1,48 @@
 from rest_framework import serializers
 from .models import StoreItem, Transaction
-from users.serializers import UserSerializer
+from core.images import FORMATS
+from core.serializers import RowSerializer, media_url
+from users.serializers import UserSerializer, UserRowSerializer
+
+def image_srcset(status, variants, request):
+    """
+    {format: srcset} for the rendered variants, e.g. {'webp': '<url> 160w, <url> 480w', ...},
+    or None until the variants are ready.
+    """
+    if status != StoreItem.ImageStatus.READY or not variants:
+        return None
+    entries = sorted(variants.values(), key=lambda entry: entry['width'])
+    srcset = {}
+    for fmt in FORMATS:
+        widths = {}
+        for entry in entries:
+            widths.setdefault(entry['width'], entry[fmt]) # Small images can repeat a width
+        srcset[fmt] = ', '.join(f'{media_url(path, request)} {width}w' for width, path in widths.items())
+    return srcset
+
+
+def image_url(image, status, variants, request):
+    """The largest rendered JPEG once ready, the original upload before that."""
+    if status == StoreItem.ImageStatus.READY and variants.get('full'):
+        return media_url(variants['full']['jpeg'], request)
+    return media_url(image, request) if image else None
+
 
 class StoreItemSerializer(serializers.ModelSerializer):
     """
     Serializes StoreItem data.
-    - Provides a full, absolute URL for the image.
+    - Provides a full, absolute URL for the image, and a srcset of its
+      responsive variants once they are rendered ('imageStatus' is 'ready').
     - The 'image' field is write-only, as the 'imageUrl' is used for responses.
     """
     image_url = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = StoreItem
         fields = [
             'id', 'name', 'description', 'xp_cost', 'image',
-            'image_url', 'stock_quantity', 'is_active', 'created_at'
+            'image_url', 'image_srcset', 'image_status', 'stock_quantity', 'is_active', 'created_at'
         ]
         # The raw 'image' field is for upload only.
         extra_kwargs = {
@@ -25,11 +53,34 @@ class StoreItemSerializer(serializers.ModelSerializer):
         """
         Returns the absolute URL for the item's image.
         """
-        request = self.context.get('request')
-        if obj.image and hasattr(obj.image, 'url'):
-            # build_absolute_uri creates a full URL (e.g., http://.../media/...)
-            return request.build_absolute_uri(obj.image.url)
-        return None
+        return image_url(obj.image.name, obj.image_status, obj.image_variants, self.context.get('request'))
+
+    def get_image_srcset(self, obj):
+        return image_srcset(obj.image_status, obj.image_variants, self.context.get('request'))
+
+
+class StoreItemRowSerializer(RowSerializer):
+    """
+    Read-only, values()-based equivalent of StoreItemSerializer for list responses.
+    """
+    fields = [
+        'id', 'name', 'description', 'xp_cost', 'image_url', 'image_srcset', 'image_status',
+        'stock_quantity', 'is_active', 'created_at'
+    ]
+    datetime_fields = ('created_at',)
+    method_lookups = {
+        'image_url': ('image', 'image_status', 'image_variants'),
+        'image_srcset': ('image_status', 'image_variants'),
+    }
+
+    def get_image_url(self, row, prefix):
+        return image_url(
+            row[f'{prefix}image'], row[f'{prefix}image_status'], row[f'{prefix}image_variants'],
+            self.context.get('request'),
+        )
+
+    def get_image_srcset(self, row, prefix):
+        return image_srcset(row[f'{prefix}image_status'], row[f'{prefix}image_variants'], self.context.get('request'))
 
 
 class TransactionSerializer(serializers.ModelSerializer):
@@ -45,6 +96,15 @@ class TransactionSerializer(serializers.ModelSerializer):
         fields = ['id', 'student', 'item', 'xp_cost_at_purchase', 'timestamp']
 
 
+class TransactionRowSerializer(RowSerializer):
+    """
+    Read-only, values()-based equivalent of TransactionSerializer for list responses.
+    """
+    fields = TransactionSerializer.Meta.fields
+    nested = {'student': UserRowSerializer, 'item': StoreItemRowSerializer}
+    datetime_fields = ('timestamp',)
+
+
 class CreateTransactionSerializer(serializers.Serializer):
     """
     Used by teachers to record a new purchase. It only requires the IDs,
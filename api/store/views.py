@@ -1,17 +1,23 @@
-from django.db import transaction
-from django.shortcuts import get_object_or_404
 from rest_framework import viewsets, status, mixins
 from rest_framework.response import Response
+from rest_framework.exceptions import NotFound
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.filters import OrderingFilter
 from django_filters.rest_framework import DjangoFilterBackend
 
-from .models import StoreItem, Transaction
-from .serializers import StoreItemSerializer, TransactionSerializer, CreateTransactionSerializer
-from students.models import StudentProfile
+from .models import StoreItem, Transaction, PurchaseError
+from .serializers import (
+    StoreItemSerializer, StoreItemRowSerializer, TransactionSerializer, TransactionRowSerializer,
+    CreateTransactionSerializer,
+)
+from core.export import stream_export
+from core.filters import IndexedSearchFilter
+from core.mixins import ConditionalGetMixin, RowListMixin, SparseFieldsetMixin, VersionedListCacheMixin
+from core.pagination import KeysetPagination
 from core.permissions import IsTeacher
 
-class StoreItemViewSet(viewsets.ModelViewSet):
+class StoreItemViewSet(ConditionalGetMixin, VersionedListCacheMixin, SparseFieldsetMixin, RowListMixin, viewsets.ModelViewSet):
     """
     Manages items in the Dev Store.
     - Teachers have full CRUD access.
@@ -19,9 +25,14 @@ class StoreItemViewSet(viewsets.ModelViewSet):
     """
     queryset = StoreItem.objects.all().order_by('xp_cost')
     serializer_class = StoreItemSerializer
+    row_serializer_class = StoreItemRowSerializer
+    etag_scopes = ['catalog']
+    # The catalog is shared by every school, so one cached page serves them all
+    list_cache_scopes = ['catalog']
+    list_cache_prefix = 'store-catalog'
     
     # Server-side filtering for store browsing
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, IndexedSearchFilter, OrderingFilter]
     search_fields = ['name', 'description']
     ordering_fields = ['name', 'xp_cost', 'stock_quantity']
 
@@ -44,12 +55,20 @@ class StoreItemViewSet(viewsets.ModelViewSet):
             qs = qs.filter(is_active=True, stock_quantity__gt=0)
         return qs
 
+    def get_list_cache_variant(self, request):
+        # Students see a filtered catalog; everyone else sees every item.
+        user = request.user
+        return 'student' if user.is_authenticated and user.role == 'STUDENT' else 'staff'
+
     def perform_create(self, serializer):
         # Store items are shared across all schools, no school assignment needed
         serializer.save()
 
 
-class TransactionViewSet(mixins.CreateModelMixin,
+class TransactionViewSet(ConditionalGetMixin,
+                         SparseFieldsetMixin,
+                         RowListMixin,
+                         mixins.CreateModelMixin,
                          mixins.RetrieveModelMixin,
                          mixins.ListModelMixin,
                          viewsets.GenericViewSet):
@@ -58,14 +77,30 @@ class TransactionViewSet(mixins.CreateModelMixin,
     This is not a full ModelViewSet because transactions should be immutable (no update/delete).
     """
     queryset = Transaction.objects.select_related('student', 'item').all()
+    row_serializer_class = TransactionRowSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-timestamp', '-id') # Seek keys for ?cursor= pagination
+    etag_scopes = ['school', 'catalog'] # Transactions embed store item details
     
     # Server-side filtering for the transactions log
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, IndexedSearchFilter, OrderingFilter]
     filterset_fields = {'student__id': ['exact'], 'item__id': ['exact'], 'timestamp': ['gte', 'lte']}
     search_fields = ['student__username', 'item__name']
     ordering_fields = ['timestamp', 'student__username', 'item__name']
 
+    # Columns for the streaming export, as (header, lookup) pairs
+    export_columns = [
+        ('id', 'id'),
+        ('timestamp', 'timestamp'),
+        ('studentId', 'student_id'),
+        ('studentUsername', 'student__username'),
+        ('studentFullName', 'student__full_name'),
+        ('itemId', 'item_id'),
+        ('itemName', 'item__name'),
+        ('xpCostAtPurchase', 'xp_cost_at_purchase'),
+    ]
+
     def get_serializer_class(self):
         """Use a different serializer for creating vs. reading transactions."""
         if self.action == 'create':
@@ -79,42 +114,31 @@ class TransactionViewSet(mixins.CreateModelMixin,
             qs = qs.filter(school_id=user.school_id)
         return qs
 
+    @action(detail=False, methods=['get'], permission_classes=[IsTeacher])
+    def export(self, request):
+        """
+        Streams the full (filtered, searched and ordered) transaction log as CSV or NDJSON.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        return stream_export(request, queryset, self.export_columns, filename='transactions')
+
     def create(self, request, *args, **kwargs):
         """Handles the logic for a student purchasing an item."""
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        student_id = serializer.validated_data['student_id']
-        item_id = serializer.validated_data['item_id']
-
-        student_profile = get_object_or_404(StudentProfile, user_id=student_id)
-        item = get_object_or_404(StoreItem, id=item_id)
-
-        # --- Business Logic Validations ---
-        if not item.is_active or item.stock_quantity <= 0:
-            return Response({"error": "This item is no longer available."}, status=status.HTTP_400_BAD_REQUEST)
-        
-        if student_profile.available_xp < item.xp_cost:
-            return Response({"error": "Student does not have enough available XP."}, status=status.HTTP_400_BAD_REQUEST)
-
-        # --- Perform Purchase in an Atomic Transaction ---
-        with transaction.atomic():
-            # 1. Decrement student's available XP (total_xp is untouched)
-            student_profile.available_xp -= item.xp_cost
-            student_profile.save()
-
-            # 2. Decrement item stock
-            item.stock_quantity -= 1
-            item.save()
-
-            # 3. Create the immutable transaction record
-            transaction_record = Transaction.objects.create(
-                student=student_profile.user,
-                item=item,
-                xp_cost_at_purchase=item.xp_cost,
-                school=request.user.school
+        try:
+            transaction_record = Transaction.objects.purchase(
+                student_id=serializer.validated_data['student_id'],
+                item_id=serializer.validated_data['item_id'],
+                school_id=request.user.school_id
             )
-        
+        except PurchaseError as exc:
+            if exc.status_code == status.HTTP_404_NOT_FOUND:
+                raise NotFound(str(exc))
+            return Response({"error": str(exc)}, status=exc.status_code)
+
         # Return the created transaction record using the detailed serializer
+        transaction_record = Transaction.objects.select_related('student', 'item').get(pk=transaction_record.pk)
         response_serializer = TransactionSerializer(transaction_record, context={'request': request})
         return Response(response_serializer.data, status=status.HTTP_201_CREATED)
\ No newline at end of file
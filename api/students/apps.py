@@ -4,3 +4,19 @@ from django.apps import AppConfig
 class StudentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'students'
+
+    def ready(self):
+        from core import search, shards
+        from .models import StudentProfile, XpGrantLog
+        shards.register(StudentProfile)
+        shards.register(XpGrantLog)
+        search.register(
+            StudentProfile,
+            ['user__username', 'user__full_name', 'user__email'],
+            follow={'users.User': ['user']},
+        )
+        search.register(
+            XpGrantLog,
+            ['student__username', 'teacher__username', 'reason'],
+            follow={'users.User': ['student', 'teacher']},
+        )
@@ -0,0 +1,116 @@
+# students/leaderboard.py
+
+"""
+Incrementally maintained, per-school leaderboard ranks.
+
+Every StudentProfile stores its 1-based position on its school's leaderboard
+(ordered by total XP, then full name, then user id). Instead of sorting the whole
+school on every read, ranks are shifted in place whenever a student moves, joins
+or leaves, so showing a page, looking up one student's rank and fetching the
+top N are all index range scans on (school, rank).
+"""
+
+from django.db import router, transaction
+from django.db.models import F, Q
+
+from users.models import School
+from .models import StudentProfile
+
+LEADERBOARD_ORDERING = ('-total_xp', 'user__full_name', 'user_id')
+
+
+def _database():
+    """The database of the current school's profiles (see core.shards)."""
+    return router.db_for_write(StudentProfile)
+
+
+def lock(school_id, using=None):
+    """
+    Locks a school's leaderboard until the current transaction on `using` (the
+    database of its profiles by default) ends; no-op outside PostgreSQL/MySQL.
+
+    Rank maintenance shifts other students' rows, so every transaction that changes
+    a student's total XP or name, or adds or removes a student, takes this lock
+    before writing any profile. Writers then queue on the school instead of each
+    holding a row the other is about to shift (a deadlock). Taking it again in the
+    same transaction is a no-op.
+    """
+    using = using or _database()
+    # The school's row, on the database of its profiles, where a copy of it is kept.
+    list(School.objects.using(using).select_for_update().filter(pk=school_id).values_list('pk', flat=True))
+
+
+def _rank_of(school_id, user_id, total_xp, full_name):
+    """The rank a student with the given sort key should occupy."""
+    ahead = StudentProfile.objects.filter(school_id=school_id).filter(
+        Q(total_xp__gt=total_xp)
+        | Q(total_xp=total_xp, user__full_name__lt=full_name)
+        | Q(total_xp=total_xp, user__full_name=full_name, user_id__lt=user_id)
+    )
+    return ahead.count() + 1
+
+
+def reposition(user_id):
+    """
+    Moves a single student to their correct rank after their XP or name changed,
+    shifting only the students between the old and the new position.
+    """
+    using = _database()
+    with transaction.atomic(using=using):
+        profile = (
+            StudentProfile.objects.select_related('user')
+            .only('school_id', 'total_xp', 'rank', 'user__full_name')
+            .filter(pk=user_id)
+            .first()
+        )
+        if profile is None:
+            return None
+        lock(profile.school_id, using) # Normally already held by the caller
+        # Re-read the current rank now that we hold the school lock.
+        old_rank = StudentProfile.objects.filter(pk=user_id).values_list('rank', flat=True).first()
+        new_rank = _rank_of(profile.school_id, user_id, profile.total_xp, profile.user.full_name)
+        siblings = StudentProfile.objects.filter(school_id=profile.school_id).exclude(pk=user_id)
+
+        if old_rank is None:
+            # Newly indexed student: everyone at or behind the new position moves down.
+            siblings.filter(rank__gte=new_rank).update(rank=F('rank') + 1)
+        elif new_rank < old_rank:
+            siblings.filter(rank__gte=new_rank, rank__lt=old_rank).update(rank=F('rank') + 1)
+        elif new_rank > old_rank:
+            siblings.filter(rank__gt=old_rank, rank__lte=new_rank).update(rank=F('rank') - 1)
+
+        if new_rank != old_rank:
+            StudentProfile.objects.filter(pk=user_id).update(rank=new_rank)
+        return new_rank
+
+
+def remove(school_id, rank):
+    """Closes the gap left by a student who is no longer on the leaderboard."""
+    if rank is None:
+        return
+    using = _database()
+    with transaction.atomic(using=using):
+        lock(school_id, using)
+        StudentProfile.objects.filter(school_id=school_id, rank__gt=rank).update(rank=F('rank') - 1)
+
+
+def rebuild(school_id):
+    """
+    Recomputes every rank in a school from scratch, writing only the rows that
+    changed. Used after bulk changes and by the `rebuild_leaderboard` command.
+    """
+    using = _database()
+    with transaction.atomic(using=using):
+        lock(school_id, using)
+        rows = (
+            StudentProfile.objects.filter(school_id=school_id)
+            .order_by(*LEADERBOARD_ORDERING)
+            .values_list('pk', 'rank')
+        )
+        changed = [
+            StudentProfile(pk=pk, rank=position)
+            for position, (pk, rank) in enumerate(rows, start=1)
+            if rank != position
+        ]
+        StudentProfile.objects.bulk_update(changed, ['rank'], batch_size=500)
+    return len(changed)
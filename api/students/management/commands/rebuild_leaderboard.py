@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from core import shards
+from users.models import School
+from students import leaderboard
+
+class Command(BaseCommand):
+    help = 'Recompute the stored leaderboard ranks for one or all schools.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--school', type=int, help='Only rebuild the school with this id.')
+
+    def handle(self, *args, **options):
+        schools = School.objects.all()
+        if options['school']:
+            schools = schools.filter(pk=options['school'])
+        for school in schools:
+            with shards.use_school(school.pk):
+                changed = leaderboard.rebuild(school.pk)
+            self.stdout.write(f'{school.name}: {changed} rank(s) updated.')
+        self.stdout.write(self.style.SUCCESS('Leaderboard ranks are up to date.'))
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.4 on 2026-10-17 20:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_ranks(apps, schema_editor):
+    StudentProfile = apps.get_model('students', 'StudentProfile')
+    db = schema_editor.connection.alias
+    school_ids = StudentProfile.objects.using(db).values_list('school_id', flat=True).distinct()
+    for school_id in list(school_ids):
+        pks = (
+            StudentProfile.objects.using(db)
+            .filter(school_id=school_id)
+            .order_by('-total_xp', 'user__full_name', 'user_id')
+            .values_list('pk', flat=True)
+        )
+        profiles = [StudentProfile(pk=pk, rank=position) for position, pk in enumerate(pks, start=1)]
+        StudentProfile.objects.using(db).bulk_update(profiles, ['rank'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0002_studentprofile_report_card'),
+        ('users', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentprofile',
+            name='rank',
+            field=models.PositiveIntegerField(blank=True, editable=False, help_text='Position on the school leaderboard. Maintained by students.leaderboard.', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='studentprofile',
+            index=models.Index(fields=['school', 'rank'], name='students_profile_rank_idx'),
+        ),
+        migrations.RunPython(populate_ranks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.4 on 2026-10-17 20:57
+
+import core.validators
+import dev_xp_camp.utils
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0004_image_upload_limits'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='studentprofile',
+            name='report_card',
+            field=models.FileField(blank=True, help_text="Student's report card image file", max_length=255, null=True, upload_to=dev_xp_camp.utils.get_upload_path, validators=[core.validators.validate_image_upload]),
+        ),
+    ]
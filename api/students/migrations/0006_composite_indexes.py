@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-17 21:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0005_alter_studentprofile_report_card'),
+        ('users', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='studentprofile',
+            index=models.Index(fields=['school', '-total_xp'], name='students_profile_xp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='xpgrantlog',
+            index=models.Index(fields=['school', '-date', '-id'], name='students_xplog_school_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='xpgrantlog',
+            index=models.Index(fields=['student', '-date'], name='students_xplog_student_idx'),
+        ),
+    ]
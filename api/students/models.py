@@ -1,9 +1,69 @@
-from django.db import models
+from django.db import models, connections, router, transaction
 from django.conf import settings
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, pre_delete
 from django.dispatch import receiver
 from django.utils.translation import gettext_lazy as _
 from dev_xp_camp.utils import get_upload_path
+from core import shards
+from core.shards import GlobalIdManager, GlobalIdModel
+from core.validators import validate_image_upload
+from core.versioning import bump_school
+
+
+class StudentProfileManager(models.Manager):
+    """
+    Manager for StudentProfile with set-based XP operations.
+    """
+    def increment_xp(self, user_id, amount):
+        """
+        Atomically adds XP to one student's total and available XP.
+        The increment happens in the database (no read-modify-write), and the new
+        values come back through UPDATE ... RETURNING where the backend supports it.
+        Returns a (total_xp, available_xp) tuple, or None if the profile does not exist.
+        """
+        using = self._db or router.db_for_write(self.model)
+        connection = connections[using]
+        supports_returning = connection.vendor == 'postgresql' or (
+            connection.vendor == 'sqlite' and connection.features.can_return_columns_from_insert
+        )
+        if supports_returning:
+            qn = connection.ops.quote_name
+            opts = self.model._meta
+            total, available = qn(opts.get_field('total_xp').column), qn(opts.get_field('available_xp').column)
+            sql = (
+                f"UPDATE {qn(opts.db_table)} SET {total} = {total} + %s, {available} = {available} + %s "
+                f"WHERE {qn(opts.pk.column)} = %s RETURNING {total}, {available}"
+            )
+            with connection.cursor() as cursor:
+                cursor.execute(sql, [amount, amount, user_id])
+                return cursor.fetchone()
+
+        updated = self.filter(pk=user_id).update(
+            total_xp=models.F('total_xp') + amount,
+            available_xp=models.F('available_xp') + amount,
+        )
+        if not updated:
+            return None
+        return self.filter(pk=user_id).values_list('total_xp', 'available_xp').first()
+
+    def grant_xp(self, amounts):
+        """
+        Adds XP to many students in a single UPDATE.
+        `amounts` maps a student's user ID to the XP to add to both their total and available XP.
+        Returns the number of profiles updated.
+        """
+        if not amounts:
+            return 0
+        increment = models.Case(
+            *[models.When(pk=user_id, then=models.Value(xp)) for user_id, xp in amounts.items()],
+            default=models.Value(0),
+            output_field=models.PositiveIntegerField(),
+        )
+        return self.filter(pk__in=amounts.keys()).update(
+            total_xp=models.F('total_xp') + increment,
+            available_xp=models.F('available_xp') + increment,
+        )
+
 
 class StudentProfile(models.Model):
     """
@@ -31,30 +91,95 @@ class StudentProfile(models.Model):
     )
     report_card = models.FileField(
         upload_to=get_upload_path,
+        max_length=255,
         null=True,
         blank=True,
+        validators=[validate_image_upload],
         help_text=_("Student's report card image file")
     )
+    rank = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text=_("Position on the school leaderboard. Maintained by students.leaderboard.")
+    )
+
+    objects = StudentProfileManager()
 
     def __str__(self):
         return f"{self.user.username}'s Profile"
 
+    def save(self, *args, **kwargs):
+        # The rank is owned by students.leaderboard; never write back a stale copy of it.
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'rank'
+            ]
+        if not self._state.adding and 'total_xp' not in kwargs['update_fields']:
+            return super().save(*args, **kwargs)
+        # The post_save receiver moves the student: lock the leaderboard before the row is written.
+        from .leaderboard import lock
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            lock(self.school_id, using)
+            super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = _("Student Profile")
         verbose_name_plural = _("Student Profiles")
+        indexes = [
+            models.Index(fields=['school', 'rank'], name='students_profile_rank_idx'),
+            # Ordering by XP within a school, and the "who is ahead" counts in students.leaderboard.
+            models.Index(fields=['school', '-total_xp'], name='students_profile_xp_idx'),
+        ]
 
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
-def create_student_profile(sender, instance, created, **kwargs):
+def create_student_profile(sender, instance, created, using, **kwargs):
     """
     A signal to automatically create a StudentProfile whenever a new User
     with the 'STUDENT' role is created.
     """
     if created and instance.role == 'STUDENT':
         StudentProfile.objects.create(user=instance, school=instance.school)
+    elif not created and instance.role == 'STUDENT':
+        # A renamed student may need to move among students with equal XP.
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'full_name' in update_fields:
+            from .leaderboard import reposition
+            with shards.use_database(using):
+                reposition(instance.pk)
 
 
-class XpGrantLog(models.Model):
+@receiver(post_save, sender=StudentProfile)
+def index_student_rank(sender, instance, created, using, update_fields=None, **kwargs):
+    """
+    Places a newly created profile on its school's leaderboard, and moves a profile
+    whose total XP was saved (e.g. edited through the API or the admin).
+    """
+    if created or update_fields is None or 'total_xp' in update_fields:
+        from .leaderboard import reposition
+        with shards.use_database(using):
+            instance.rank = reposition(instance.pk)
+
+
+@receiver(pre_delete, sender=StudentProfile)
+def lock_student_rank(sender, instance, using, **kwargs):
+    """Locks the leaderboard before the profile's row is deleted (see leaderboard.lock())."""
+    from .leaderboard import lock
+    lock(instance.school_id, using)
+
+
+@receiver(post_delete, sender=StudentProfile)
+def unindex_student_rank(sender, instance, using, **kwargs):
+    """Closes the leaderboard gap left by a deleted profile."""
+    from .leaderboard import remove
+    with shards.use_database(using):
+        remove(instance.school_id, instance.rank)
+
+
+class XpGrantLog(GlobalIdModel):
     student = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -76,5 +201,23 @@ class XpGrantLog(models.Model):
         related_name='xp_grant_logs',
     )
 
+    objects = GlobalIdManager()
+
     def __str__(self):
-        return f"{self.teacher} → {self.student}: {self.amount} XP ({self.reason})"
\ No newline at end of file
+        return f"{self.teacher} → {self.student}: {self.amount} XP ({self.reason})"
+
+    class Meta:
+        indexes = [
+            # A school's history, newest first (also the keyset pagination order).
+            models.Index(fields=['school', '-date', '-id'], name='students_xplog_school_date_idx'),
+            models.Index(fields=['student', '-date'], name='students_xplog_student_idx'),
+        ]
+
+
+@receiver(post_save, sender=StudentProfile)
+@receiver(post_delete, sender=StudentProfile)
+@receiver(post_save, sender=XpGrantLog)
+@receiver(post_delete, sender=XpGrantLog)
+def bump_school_version(sender, instance, **kwargs):
+    """Invalidates ETags for the school whose students or XP history changed."""
+    bump_school(instance.school_id)
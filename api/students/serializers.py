@@ -1,7 +1,8 @@
 from rest_framework import serializers
 from .models import StudentProfile
 from .models import XpGrantLog
-from users.serializers import UserSerializer
+from core.serializers import RowSerializer
+from users.serializers import UserSerializer, UserRowSerializer
 
 class StudentProfileSerializer(serializers.ModelSerializer):
     """
@@ -13,7 +14,17 @@ class StudentProfileSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = StudentProfile
-        fields = ['user', 'total_xp', 'available_xp', 'report_card']
+        fields = ['user', 'total_xp', 'available_xp', 'report_card', 'rank']
+        read_only_fields = ['rank'] # Maintained by students.leaderboard
+
+
+class StudentProfileRowSerializer(RowSerializer):
+    """
+    Read-only, values()-based equivalent of StudentProfileSerializer for list responses.
+    """
+    fields = StudentProfileSerializer.Meta.fields
+    nested = {'user': UserRowSerializer}
+    file_fields = ('report_card',)
 
 
 class AddXPSerializer(serializers.Serializer):
@@ -29,10 +40,33 @@ class AddXPSerializer(serializers.Serializer):
     )
 
 
+class BulkAddXPEntrySerializer(AddXPSerializer):
+    """
+    One entry of a bulk XP grant: which student, how much XP and why.
+    """
+    student_id = serializers.IntegerField(help_text="The user ID of the student receiving the XP.")
+
+
+class BulkAddXPSerializer(serializers.Serializer):
+    """
+    Validates the input for the 'bulk-add-xp' custom action.
+    """
+    grants = BulkAddXPEntrySerializer(many=True, allow_empty=False)
+
+
 class XpGrantLogSerializer(serializers.ModelSerializer):
     student = UserSerializer(read_only=True)
     teacher = UserSerializer(read_only=True)
 
     class Meta:
         model = XpGrantLog
-        fields = ['id', 'student', 'teacher', 'amount', 'reason', 'date']
\ No newline at end of file
+        fields = ['id', 'student', 'teacher', 'amount', 'reason', 'date']
+
+
+class XpGrantLogRowSerializer(RowSerializer):
+    """
+    Read-only, values()-based equivalent of XpGrantLogSerializer for list responses.
+    """
+    fields = XpGrantLogSerializer.Meta.fields
+    nested = {'student': UserRowSerializer, 'teacher': UserRowSerializer}
+    datetime_fields = ('date',)
@@ -0,0 +1,100 @@
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from users.models import School, User
+from . import leaderboard
+from .models import StudentProfile
+
+
+@override_settings(DATABASE_SHARD_URLS=[], DATABASE_ROUTERS=[])
+class LeaderboardTests(TestCase):
+    """Ranks are shifted in place as students gain XP, are renamed, join or leave."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.school = School.objects.create(name='School', code='school')
+        cls.teacher = User.objects.create(username='teacher', role=User.Role.TEACHER, is_staff=True, school=cls.school)
+        cls.students = [
+            User.objects.create(username=f'student-{n}', full_name=f'Student {n}', school=cls.school)
+            for n in range(5)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+
+    def ranks(self):
+        """Usernames in rank order, after checking the ranks are dense and match a full sort."""
+        rows = StudentProfile.objects.filter(school=self.school).order_by('rank').values_list('rank', 'user__username')
+        self.assertEqual([rank for rank, _ in rows], list(range(1, len(rows) + 1)))
+        self.assertEqual(leaderboard.rebuild(self.school.pk), 0)
+        return [username for _, username in rows]
+
+    def add_xp(self, student, xp):
+        return self.client.post(f'/api/v1/students/profiles/{student.pk}/add-xp/', {'xpPoints': xp}, format='json')
+
+    def test_new_students_are_ranked_by_name(self):
+        self.assertEqual(self.ranks(), [f'student-{n}' for n in range(5)])
+
+    def test_gaining_xp_moves_a_student_up(self):
+        response = self.add_xp(self.students[3], 50)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data']['rank'], 1)
+        self.assertEqual(self.ranks(), ['student-3', 'student-0', 'student-1', 'student-2', 'student-4'])
+
+        self.add_xp(self.students[1], 20)
+        self.add_xp(self.students[4], 50)
+        self.assertEqual(self.ranks(), ['student-3', 'student-4', 'student-1', 'student-0', 'student-2'])
+
+    def test_bulk_grants_keep_ranks(self):
+        response = self.client.post('/api/v1/students/profiles/bulk-add-xp/', {'grants': [
+            {'studentId': self.students[2].pk, 'xpPoints': 10},
+            {'studentId': self.students[4].pk, 'xpPoints': 30},
+            {'studentId': self.students[2].pk, 'xpPoints': 25},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.ranks(), ['student-2', 'student-4', 'student-0', 'student-1', 'student-3'])
+
+    def test_editing_total_xp_moves_a_student(self):
+        response = self.client.patch(f'/api/v1/students/profiles/{self.students[0].pk}/', {'totalXp': 5}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.ranks()[0], 'student-0')
+
+        self.add_xp(self.students[2], 10)
+        self.client.patch(f'/api/v1/students/profiles/{self.students[2].pk}/', {'totalXp': 0}, format='json')
+        self.assertEqual(self.ranks(), ['student-0', 'student-1', 'student-2', 'student-3', 'student-4'])
+
+    def test_renaming_reorders_ties(self):
+        self.students[0].full_name = 'Zed'
+        self.students[0].save()
+        self.assertEqual(self.ranks(), ['student-1', 'student-2', 'student-3', 'student-4', 'student-0'])
+
+    def test_leaving_closes_the_gap(self):
+        self.add_xp(self.students[4], 10)
+        self.students[1].delete()
+        self.assertEqual(self.ranks(), ['student-4', 'student-0', 'student-2', 'student-3'])
+
+    def test_leaderboard_pages(self):
+        self.add_xp(self.students[4], 10)
+        response = self.client.get('/api/v1/students/leaderboard/', {'pageSize': 2, 'page': 2})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()['data']
+        self.assertEqual([item['user']['username'] for item in data['items']], ['student-1', 'student-2'])
+        self.assertEqual([item['rank'] for item in data['items']], [3, 4])
+        self.assertEqual(data['pagination']['count'], 5)
+        self.assertEqual(data['pagination']['totalPages'], 3)
+
+    def test_leaderboard_ordering(self):
+        for n, student in enumerate(self.students):
+            self.add_xp(student, 10 * (n + 1))
+        response = self.client.get('/api/v1/students/leaderboard/', {'ordering': 'total_xp', 'pageSize': 2, 'page': 3})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()['data']
+        self.assertEqual([item['user']['username'] for item in data['items']], ['student-4'])
+        self.assertEqual(data['pagination']['count'], 5)
+
+    def test_rank_lookup(self):
+        self.add_xp(self.students[2], 10)
+        response = self.client.get(f'/api/v1/students/leaderboard/{self.students[2].pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data']['rank'], 1)
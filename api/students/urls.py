@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import StudentViewSet, LeaderboardView, XpGrantLogListView
+from .views import StudentViewSet, LeaderboardView, LeaderboardRankView, XpGrantLogListView, XpGrantLogExportView
 
 router = DefaultRouter()
 # The StudentViewSet handles CRUD for student profiles and adding XP.
@@ -10,7 +10,9 @@ router.register('profiles', StudentViewSet, basename='student-profile')
 urlpatterns = [
     # A dedicated, read-only endpoint for the leaderboard.
     path('leaderboard/', LeaderboardView.as_view(), name='leaderboard'),
+    path('leaderboard/<int:user_id>/', LeaderboardRankView.as_view(), name='leaderboard-rank'),
     path('xp-history/', XpGrantLogListView.as_view(), name='xp-history'),
+    path('xp-history/export/', XpGrantLogExportView.as_view(), name='xp-history-export'),
 
     # Include the router-generated URLs for student profile management.
     path('', include(router.urls)),
@@ -1,18 +1,34 @@
 # students/views.py
 
-from django.db import transaction
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files.base import ContentFile
+from django.db import connections, router, transaction
+from django.db.models import Max
+from django.http import Http404
 from rest_framework import viewsets, status, generics
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.filters import OrderingFilter
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 
 from .models import StudentProfile, XpGrantLog
-from .serializers import StudentProfileSerializer, AddXPSerializer, XpGrantLogSerializer
+from .serializers import (
+    StudentProfileSerializer, StudentProfileRowSerializer, AddXPSerializer, BulkAddXPSerializer,
+    XpGrantLogSerializer, XpGrantLogRowSerializer,
+)
+from core import images, search
+from core.export import stream_export
+from core.filters import IndexedSearchFilter
+from core.mixins import ConditionalGetMixin, RowListMixin, SparseFieldsetMixin
+from core.pagination import CustomPagination, KeysetPagination, RankPagination
 from core.permissions import IsTeacher
+from core.validators import validate_image_upload
+from core.versioning import bump_school
+from . import leaderboard
 
-class StudentViewSet(viewsets.ModelViewSet):
+class StudentViewSet(ConditionalGetMixin, SparseFieldsetMixin, RowListMixin, viewsets.ModelViewSet):
     """
     For Teachers: Manage student profiles.
     This includes viewing, editing, and adding XP.
@@ -25,10 +41,12 @@ class StudentViewSet(viewsets.ModelViewSet):
             qs = qs.filter(school_id=user.school_id)
         return qs
     serializer_class = StudentProfileSerializer
+    row_serializer_class = StudentProfileRowSerializer
     permission_classes = [IsTeacher]
+    etag_scopes = ['school']
     lookup_field = 'user_id' # Use user ID for lookups, e.g., /students/profiles/5/
 
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, IndexedSearchFilter, OrderingFilter]
     search_fields = ['user__username', 'user__full_name', 'user__email']
     ordering_fields = ['user__full_name', 'total_xp', 'available_xp']
 
@@ -47,22 +65,93 @@ class StudentViewSet(viewsets.ModelViewSet):
         
         xp_to_add = serializer.validated_data['xp_points']
 
-        # Use an atomic transaction to ensure data integrity
-        with transaction.atomic():
-            profile.total_xp += xp_to_add
-            profile.available_xp += xp_to_add
-            profile.save()
+        # Increment in the database so concurrent grants can't overwrite each other
+        with transaction.atomic(using=router.db_for_write(StudentProfile)):
+            leaderboard.lock(profile.school_id) # Before the student's row (see leaderboard.lock())
+            balance = StudentProfile.objects.increment_xp(profile.pk, xp_to_add)
+            if balance is None:
+                raise Http404
+            profile.total_xp, profile.available_xp = balance
             # Log the XP grant
             XpGrantLog.objects.create(
                 student=profile.user,
                 teacher=request.user,
                 amount=xp_to_add,
                 reason=serializer.validated_data.get('reason', ''),
-                school=request.user.school
+                school_id=request.user.school_id
             )
+            profile.rank = leaderboard.reposition(profile.pk)
         response_serializer = StudentProfileSerializer(profile, context={'request': request})
         return Response(response_serializer.data, status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=['post'], url_path='bulk-add-xp', serializer_class=BulkAddXPSerializer)
+    def bulk_add_xp(self, request):
+        """
+        Custom action for a teacher to award XP to many students at once.
+        All grants are applied in one transaction with a single UPDATE and a single
+        bulk insert of XpGrantLog rows. Returns a result for every requested entry.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        grants = serializer.validated_data['grants']
+
+        requested_ids = {grant['student_id'] for grant in grants}
+        found_ids = set(self.get_queryset().filter(pk__in=requested_ids).values_list('pk', flat=True))
+
+        amounts = {}
+        for grant in grants:
+            if grant['student_id'] in found_ids:
+                amounts[grant['student_id']] = amounts.get(grant['student_id'], 0) + grant['xp_points']
+
+        with transaction.atomic(using=router.db_for_write(StudentProfile)):
+            if amounts:
+                leaderboard.lock(request.user.school_id) # Before any student's row (see leaderboard.lock())
+            StudentProfile.objects.grant_xp(amounts)
+            last_log_id = None
+            if not connections[router.db_for_write(XpGrantLog)].features.can_return_rows_from_bulk_insert:
+                # bulk_create() will not set the new ids (MySQL): note where they start.
+                last_log_id = XpGrantLog.objects.aggregate(last=Max('pk'))['last'] or 0
+            logs = XpGrantLog.objects.bulk_create([
+                XpGrantLog(
+                    student_id=grant['student_id'],
+                    teacher=request.user,
+                    amount=grant['xp_points'],
+                    reason=grant.get('reason', ''),
+                    school_id=request.user.school_id
+                )
+                for grant in grants if grant['student_id'] in found_ids
+            ])
+            if last_log_id is not None and any(log.pk is None for log in logs):
+                search.index(XpGrantLog, XpGrantLog.objects.filter(
+                    school_id=request.user.school_id, teacher=request.user, pk__gt=last_log_id,
+                ))
+            else:
+                search.index(XpGrantLog, [log.pk for log in logs])
+            if amounts:
+                leaderboard.rebuild(request.user.school_id)
+                bump_school(request.user.school_id)
+
+        balances = {
+            row['pk']: row
+            for row in StudentProfile.objects.filter(pk__in=amounts.keys()).values('pk', 'total_xp', 'available_xp', 'rank')
+        }
+        results = []
+        for grant in grants:
+            student_id = grant['student_id']
+            if student_id not in found_ids:
+                results.append({'student_id': student_id, 'success': False, 'error': 'Student not found.'})
+                continue
+            balance = balances[student_id]
+            results.append({
+                'student_id': student_id,
+                'success': True,
+                'xp_points': grant['xp_points'],
+                'total_xp': balance['total_xp'],
+                'available_xp': balance['available_xp'],
+                'rank': balance['rank'],
+            })
+        return Response({'granted': len(amounts), 'results': results}, status=status.HTTP_200_OK)
+
     @action(detail=True, methods=['post'], url_path='upload-report-card')
     def upload_report_card(self, request, user_id=None):
         """
@@ -76,13 +165,20 @@ class StudentViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        upload = request.FILES['report_card']
+        try:
+            validate_image_upload(upload)
+        except DjangoValidationError as exc:
+            return Response({'error': exc.messages[0]}, status=status.HTTP_400_BAD_REQUEST)
+
         # Delete old report card if exists
         if profile.report_card:
             profile.report_card.delete(save=False)
         
-        # Save new report card
-        profile.report_card = request.FILES['report_card']
-        profile.save()
+        # Save new report card, re-encoded with its size capped (decoded scaled down, see core.images)
+        data = images.downscale(upload, settings.REPORT_CARD_MAX_EDGE)
+        profile.report_card = ContentFile(data, name='report_card.jpg')
+        profile.save(update_fields=['report_card'])
         
         response_serializer = StudentProfileSerializer(profile, context={'request': request})
         return Response(response_serializer.data, status=status.HTTP_200_OK)
@@ -103,33 +199,67 @@ class StudentViewSet(viewsets.ModelViewSet):
         # Delete the file
         profile.report_card.delete(save=False)
         profile.report_card = None
-        profile.save()
+        profile.save(update_fields=['report_card'])
         
         response_serializer = StudentProfileSerializer(profile, context={'request': request})
         return Response(response_serializer.data, status=status.HTTP_200_OK)
 
 
-class LeaderboardView(generics.ListAPIView):
+class LeaderboardView(ConditionalGetMixin, SparseFieldsetMixin, RowListMixin, generics.ListAPIView):
     """
     A read-only endpoint for viewing the student leaderboard.
     Accessible by any authenticated user (students and teachers).
-    Ranked by total XP.
+    Ranked by total XP, using the maintained per-school rank index. With `?ordering=`,
+    pages are read with plain page-number pagination instead.
+    """
+    def get_queryset(self):
+        user = self.request.user
+        qs = StudentProfile.objects.select_related('user').order_by('rank')
+        if user.is_authenticated and user.school_id:
+            qs = qs.filter(school_id=user.school_id)
+        return qs
+    serializer_class = StudentProfileSerializer
+    row_serializer_class = StudentProfileRowSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = RankPagination
+    etag_scopes = ['school']
+    filter_backends = [OrderingFilter]
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            # Rank ranges only match pages of the rank order.
+            reordered = self.request.query_params.get(OrderingFilter.ordering_param)
+            self._paginator = CustomPagination() if reordered else self.pagination_class()
+        return self._paginator
+
+
+class LeaderboardRankView(ConditionalGetMixin, SparseFieldsetMixin, generics.RetrieveAPIView):
+    """
+    Looks up a single student's leaderboard entry (including their rank) by user ID.
     """
     def get_queryset(self):
         user = self.request.user
-        qs = StudentProfile.objects.select_related('user').order_by('-total_xp', 'user__full_name')
+        qs = StudentProfile.objects.select_related('user')
         if user.is_authenticated and user.school_id:
             qs = qs.filter(school_id=user.school_id)
         return qs
     serializer_class = StudentProfileSerializer
+    row_serializer_class = StudentProfileRowSerializer
     permission_classes = [IsAuthenticated]
+    lookup_field = 'user_id'
+    etag_scopes = ['school']
 
 
-class XpGrantLogListView(generics.ListAPIView):
+class XpGrantLogListView(ConditionalGetMixin, SparseFieldsetMixin, RowListMixin, generics.ListAPIView):
     queryset = XpGrantLog.objects.select_related('student', 'teacher').order_by('-date')
     serializer_class = XpGrantLogSerializer
+    row_serializer_class = XpGrantLogRowSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-date', '-id') # Seek keys for ?cursor= pagination
+    etag_scopes = ['school']
+    filter_backends = [DjangoFilterBackend, IndexedSearchFilter, OrderingFilter]
     search_fields = ['student__username', 'teacher__username', 'reason']
     ordering_fields = ['date', 'amount', 'student__username', 'teacher__username']
     def get_queryset(self):
@@ -137,4 +267,26 @@ class XpGrantLogListView(generics.ListAPIView):
         qs = XpGrantLog.objects.select_related('student', 'teacher').order_by('-date')
         if user.is_authenticated and user.school_id:
             qs = qs.filter(school_id=user.school_id)
-        return qs
\ No newline at end of file
+        return qs
+
+
+class XpGrantLogExportView(XpGrantLogListView):
+    """
+    Streams the full (filtered, searched and ordered) XP history as CSV or NDJSON.
+    """
+    permission_classes = [IsTeacher]
+    export_columns = [
+        ('id', 'id'),
+        ('date', 'date'),
+        ('studentId', 'student_id'),
+        ('studentUsername', 'student__username'),
+        ('studentFullName', 'student__full_name'),
+        ('teacherId', 'teacher_id'),
+        ('teacherUsername', 'teacher__username'),
+        ('amount', 'amount'),
+        ('reason', 'reason'),
+    ]
+
+    def get(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return stream_export(request, queryset, self.export_columns, filename='xp-history')
@@ -4,3 +4,15 @@ from django.apps import AppConfig
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'users'
+
+    def ready(self):
+        from django.contrib.admin.models import LogEntry
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+        from core import search, shards
+        from .models import School, User
+        search.register(User, ['username', 'email', 'full_name', 'phone_number'])
+        shards.replicate(School)
+        shards.register(User)
+        # Rows that refer to users live next to them.
+        for model in (OutstandingToken, BlacklistedToken, LogEntry):
+            shards.register(model)
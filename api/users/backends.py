@@ -0,0 +1,37 @@
+# users/backends.py
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from core import shards
+
+UserModel = get_user_model()
+
+
+class ShardedModelBackend(ModelBackend):
+    """
+    ModelBackend that finds users on whichever database holds their school
+    (core.shards), then routes the rest of the request to that database.
+    """
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        user = shards.find(UserModel._default_manager.all(), **{UserModel.USERNAME_FIELD: username})
+        if user is None:
+            # Run the default password hasher once to reduce the timing difference
+            # between an existing and a nonexistent user (#20760), as ModelBackend does.
+            UserModel().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            shards.activate(user.school_id)
+            return user
+        return None
+
+    def get_user(self, user_id):
+        user = shards.find(UserModel._default_manager.all(), pk=user_id)
+        if user is None or not self.user_can_authenticate(user):
+            return None
+        shards.activate(user.school_id)
+        return user
@@ -0,0 +1,135 @@
+# users/logins.py
+
+"""
+Buffered `last_login` updates.
+
+simplejwt's UPDATE_LAST_LOGIN writes the user row on every login, so a class
+logging in at once queues hundreds of single-row UPDATEs in front of the token
+responses. Instead, logins are recorded in this process and written by a
+background thread with one bulk UPDATE, at most LAST_LOGIN_FLUSH_INTERVAL seconds
+later or as soon as LAST_LOGIN_BATCH_SIZE logins are waiting.
+
+Until then, each login is also kept in the shared cache, and the user serializers
+show it instead of the older value in the database.
+"""
+
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+LAST_LOGIN_CACHE_PREFIX = 'last-login'
+
+
+def _cache_key(user_id):
+    return f'{LAST_LOGIN_CACHE_PREFIX}:{user_id}'
+
+
+class LastLoginBuffer:
+    """The logins of this process that are not written yet, by user id."""
+    def __init__(self):
+        self._pending = {} # user_id -> (school_id, logged in at)
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def record(self, user, when):
+        # Long enough to outlive a flush that is running late.
+        cache.set(_cache_key(user.pk), when, max(60, settings.LAST_LOGIN_FLUSH_INTERVAL * 4))
+        with self._lock:
+            self._pending[user.pk] = (user.school_id, when)
+            if len(self._pending) >= settings.LAST_LOGIN_BATCH_SIZE:
+                self._schedule(0)
+            elif self._timer is None:
+                self._schedule(settings.LAST_LOGIN_FLUSH_INTERVAL)
+
+    def _schedule(self, delay):
+        if self._timer is not None:
+            if delay:
+                return
+            self._timer.cancel()
+        self._timer = threading.Timer(delay, self._flush_in_background)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _flush_in_background(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Writing buffered last_login values failed")
+        finally:
+            connections.close_all() # This thread's connections only
+
+    def flush(self):
+        """
+        Writes every pending login with one bulk UPDATE per school database. Logins of
+        schools that are moving (core.shards) wait for the next flush. Returns the number written.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if self._timer is not None and self._timer is not threading.current_thread():
+                self._timer.cancel()
+            self._timer = None
+        if not pending:
+            return 0
+
+        from core import shards
+        from core.versioning import bump_school
+        from .models import User
+        by_database, deferred = {}, {}
+        for user_id, (school_id, when) in pending.items():
+            try:
+                database = shards.database_for_school(school_id, write=True)
+            except shards.SchoolMoving:
+                deferred[user_id] = (school_id, when) # Written once the school has moved
+                continue
+            by_database.setdefault(database, []).append(User(pk=user_id, last_login=when))
+        if deferred:
+            with self._lock:
+                for user_id, entry in deferred.items():
+                    self._pending.setdefault(user_id, entry)
+                self._schedule(settings.LAST_LOGIN_FLUSH_INTERVAL)
+
+        # bulk_update() sends no signals: the cached authentication user is unaffected
+        # by last_login, and the school's version is bumped once below.
+        for database, users in by_database.items():
+            User.objects.using(database).bulk_update(users, ['last_login'], batch_size=500)
+        for school_id in {school_id for user_id, (school_id, _) in pending.items() if user_id not in deferred}:
+            bump_school(school_id)
+        return len(pending) - len(deferred)
+
+
+buffer = LastLoginBuffer()
+
+
+def record_login(user, when):
+    """Notes that `user` logged in at `when`; the row is written shortly after."""
+    buffer.record(user, when)
+
+
+def pending_last_logins(user_ids):
+    """Recent logins not written yet (possibly by another process), by user id."""
+    found = cache.get_many([_cache_key(user_id) for user_id in user_ids])
+    return {
+        user_id: found[_cache_key(user_id)]
+        for user_id in user_ids if _cache_key(user_id) in found
+    }
+
+
+def latest(stored, pending):
+    """The later of a stored and a pending last_login, either of which may be None."""
+    if pending is None or (stored is not None and stored >= pending):
+        return stored
+    return pending
+
+
+@atexit.register
+def _flush_at_exit():
+    try:
+        buffer.flush()
+    except Exception:
+        logger.exception("Writing buffered last_login values at exit failed")
@@ -0,0 +1,46 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from users.models import School
+from users import roster
+
+
+class Command(BaseCommand):
+    help = 'Create the students listed in a CSV or JSON roster file in one school.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Roster file (.csv with a header row, or .json).')
+        parser.add_argument('--school', required=True, help='Code of the school the students join.')
+        parser.add_argument('--format', choices=roster.ROSTER_FORMATS, help='Defaults to the file extension.')
+        parser.add_argument('--dry-run', action='store_true', help='Only validate the roster.')
+
+    def handle(self, *args, **options):
+        try:
+            school = School.objects.get(code=options['school'])
+        except School.DoesNotExist:
+            raise CommandError(f"No school with code {options['school']!r}.")
+        format = options['format'] or os.path.splitext(options['path'])[1].lstrip('.').lower()
+        try:
+            with open(options['path'], 'rb') as source:
+                content = source.read()
+        except OSError as exc:
+            raise CommandError(str(exc))
+
+        started = time.perf_counter()
+        try:
+            rows = roster.parse_roster(content, format)
+            report = roster.import_roster(rows, school, dry_run=options['dry_run'])
+        except ValidationError as exc:
+            raise CommandError(exc.detail)
+
+        for error in report['errors']:
+            details = '; '.join(f"{field}: {' '.join(map(str, messages))}" for field, messages in error['errors'].items())
+            self.stderr.write(f"Row {error['row']}: {details}")
+        verb = 'would be created' if options['dry_run'] else 'created'
+        self.stdout.write(self.style.SUCCESS(
+            f"{school.name}: {report['created']} student(s) {verb}, {len(report['errors'])} row(s) rejected "
+            f"in {time.perf_counter() - started:.1f}s."
+        ))
@@ -0,0 +1,140 @@
+import time
+
+from django.conf import settings
+from django.contrib.admin.models import LogEntry
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from core import search, shards
+from core.models import SearchDocument
+from core.versioning import bump_school
+from store.models import Transaction
+from students.models import StudentProfile, XpGrantLog
+from users.models import School, User
+
+# School data with a global id (core.shards.GlobalIdModel, or the user's), copied as it is, parents first.
+SCHOOL_MODELS = [User, StudentProfile, XpGrantLog, Transaction]
+
+
+def _school_rows(database, school_id):
+    """Querysets of every row a school owns on `database`, in a safe order to delete them."""
+    rows = [
+        SearchDocument.objects.using(database).filter(
+            kind=search.get_spec(model).kind,
+            object_id__in=model._base_manager.using(database).filter(school_id=school_id).values('pk'),
+        )
+        for model in search.registered_models() if shards.is_sharded(model)
+    ]
+    rows += [
+        BlacklistedToken.objects.using(database).filter(token__user__school_id=school_id),
+        OutstandingToken.objects.using(database).filter(user__school_id=school_id),
+        LogEntry.objects.using(database).filter(user__school_id=school_id),
+        User.groups.through.objects.using(database).filter(user__school_id=school_id),
+        User.user_permissions.through.objects.using(database).filter(user__school_id=school_id),
+    ]
+    rows += [model._base_manager.using(database).filter(school_id=school_id) for model in reversed(SCHOOL_MODELS)]
+    return rows
+
+
+def purge(database, school_id):
+    """Deletes a school's rows from `database` without signals. Returns the number deleted."""
+    with transaction.atomic(using=database):
+        # Plain DELETEs: the receivers of a delete (leaderboard, search, ETags) must
+        # not touch the school's live copy on the other database.
+        return sum(rows._raw_delete(database) for rows in _school_rows(database, school_id))
+
+
+def copy_school(source, target, school_id):
+    """Copies a school's rows from `source` to `target`. Returns the number copied per model."""
+    copied = {}
+    for model in SCHOOL_MODELS:
+        rows = model._base_manager.using(source).filter(school_id=school_id)
+        copied[model._meta.label] = shards.copy_rows(rows, target)
+
+    # Tokens keep their jti but not their id (a per-database sequence).
+    tokens = OutstandingToken.objects.using(source).filter(user__school_id=school_id).order_by('pk')
+    copied[OutstandingToken._meta.label] = shards.copy_rows(tokens, target, with_ids=False)
+    blacklisted = list(
+        BlacklistedToken.objects.using(source).filter(token__user__school_id=school_id)
+        .values_list('token__jti', 'blacklisted_at')
+    )
+    token_ids = dict(
+        OutstandingToken.objects.using(target).filter(jti__in=[jti for jti, _ in blacklisted]).values_list('jti', 'pk')
+    )
+    fields = [BlacklistedToken._meta.get_field('token'), BlacklistedToken._meta.get_field('blacklisted_at')]
+    copied[BlacklistedToken._meta.label] = shards.insert_rows(
+        BlacklistedToken, target, fields, [(token_ids[jti], when) for jti, when in blacklisted]
+    )
+
+    for model in search.registered_models():
+        if shards.is_sharded(model):
+            search.index(model, model._default_manager.using(target).filter(school_id=school_id))
+    return copied
+
+
+class Command(BaseCommand):
+    help = (
+        "Move a school's data to another database (see core.shards). Its data stays "
+        'readable throughout; writes are refused with HTTP 503 until the move ends.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('school', help='Code of the school to move.')
+        parser.add_argument('database', help='Alias of the database to move it to, e.g. shard1 or default.')
+        parser.add_argument(
+            '--settle', type=float,
+            help='Seconds to wait for running processes to see each change of the school\'s '
+                 'database (default: SHARD_MAP_TTL + 5).',
+        )
+
+    def handle(self, *args, **options):
+        if not shards.enabled():
+            raise CommandError('No shards are configured (set DATABASE_SHARD_URLS).')
+        target = options['database']
+        if target not in shards.databases():
+            raise CommandError(f"Unknown database {target!r}; choose one of: {', '.join(shards.databases())}.")
+        try:
+            school = School.objects.using('default').get(code=options['school'])
+        except School.DoesNotExist:
+            raise CommandError(f"No school with code {options['school']!r}.")
+        source = school.database
+        if source == target:
+            raise CommandError(f'{school.name} is already on {target}.')
+        if school.moving_to not in ('', target):
+            raise CommandError(f'{school.name} is being moved to {school.moving_to}.')
+        settle = options['settle'] if options['settle'] is not None else settings.SHARD_MAP_TTL + 5
+
+        schools = School.objects.using('default').filter(pk=school.pk)
+        if target != 'default':
+            shards.sync_shared_rows(target)
+        schools.update(moving_to=target)
+        shards.schools.clear()
+        started = time.perf_counter()
+        try:
+            # Every process now refuses the school's writes; let the ones in flight finish.
+            self.wait(settle, 'for writes to stop')
+            with transaction.atomic(using=target):
+                purge(target, school.pk) # Leftovers of an earlier, interrupted move
+                copied = copy_school(source, target, school.pk)
+            schools.update(database=target, moving_to='')
+        except BaseException:
+            schools.update(moving_to='')
+            raise
+        finally:
+            shards.schools.clear()
+        for label, count in copied.items():
+            self.stdout.write(f'{label}: {count} row(s) copied to {target}.')
+
+        self.wait(settle, f'for reads to leave {source}')
+        deleted = purge(source, school.pk)
+        bump_school(school.pk)
+        self.stdout.write(self.style.SUCCESS(
+            f'{school.name} moved from {source} to {target} in {time.perf_counter() - started:.1f}s '
+            f'({deleted} row(s) removed from {source}).'
+        ))
+
+    def wait(self, seconds, reason):
+        if seconds > 0:
+            self.stdout.write(f'Waiting {seconds:g}s {reason}...')
+            time.sleep(seconds)
@@ -0,0 +1,65 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max, Min
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+from core import shards
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete expired outstanding and blacklisted refresh tokens in small batches. '
+        'Meant to run from cron, e.g. hourly: `python manage.py prune_tokens`.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help='Token ids per batch (default: 2000).')
+        parser.add_argument('--pause', type=float, default=0.0, help='Seconds to sleep between batches.')
+
+    def handle(self, *args, **options):
+        # Tokens live next to their users, on every school database (core.shards).
+        results = [
+            self.prune(using, aware_utcnow(), options['batch_size'], options['pause'])
+            for using in shards.databases()
+        ]
+        results = [result for result in results if result is not None]
+        if not results:
+            self.stdout.write(self.style.SUCCESS('No tokens to prune.'))
+            return
+        outstanding_deleted = sum(outstanding for outstanding, _ in results)
+        blacklisted_deleted = sum(blacklisted for _, blacklisted in results)
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {outstanding_deleted} expired outstanding and {blacklisted_deleted} blacklisted token(s).'
+        ))
+
+    def prune(self, using, now, batch_size, pause):
+        """
+        Deletes the expired tokens on one database. Returns the numbers of outstanding
+        and blacklisted tokens deleted, or None if the database has no tokens.
+        """
+        outstanding_tokens = OutstandingToken.objects.using(using)
+        blacklisted_tokens = BlacklistedToken.objects.using(using)
+        bounds = outstanding_tokens.aggregate(low=Min('pk'), high=Max('pk'))
+        if bounds['low'] is None:
+            return None
+
+        outstanding_deleted = blacklisted_deleted = 0
+        # Walk the primary key in ranges so every batch is an index range scan. Tokens are
+        # issued in id order with a fixed lifetime, so the first range without any expired
+        # token marks the end of the expired ones.
+        for start in range(bounds['low'], bounds['high'] + 1, batch_size):
+            in_range = {'pk__gte': start, 'pk__lt': start + batch_size}
+            expired_ids = list(outstanding_tokens.filter(expires_at__lte=now, **in_range).values_list('pk', flat=True))
+            if not expired_ids:
+                if outstanding_tokens.filter(**in_range).exists():
+                    break
+                continue
+            with transaction.atomic(using=using):
+                blacklisted_deleted += blacklisted_tokens.filter(token_id__in=expired_ids).delete()[0]
+                outstanding_deleted += outstanding_tokens.filter(pk__in=expired_ids).delete()[0]
+            if pause:
+                time.sleep(pause)
+        return outstanding_deleted, blacklisted_deleted
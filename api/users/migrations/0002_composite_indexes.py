@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 21:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['school', '-date_joined'], name='users_user_school_joined_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-17 21:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='school',
+            name='database',
+            field=models.CharField(default='default', editable=False, help_text="Database alias holding the school's data (core.shards). Changed by `manage.py move_school`.", max_length=100),
+        ),
+        migrations.AddField(
+            model_name='school',
+            name='moving_to',
+            field=models.CharField(blank=True, default='', editable=False, help_text='Database the school is being moved to; its data is read-only meanwhile.', max_length=100),
+        ),
+    ]
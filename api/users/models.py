@@ -1,10 +1,14 @@
 # users/models.py
 
 from django.contrib.auth.models import AbstractUser, BaseUserManager
-from django.db import models
+from django.db import models, router, transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.utils.translation import gettext_lazy as _
+from core.shards import GlobalIdManager, GlobalIdModel
+from core.versioning import bump_school
 
-class CustomUserManager(BaseUserManager):
+class CustomUserManager(GlobalIdManager, BaseUserManager):
     """
     Custom user model manager where username is the unique identifier.
     """
@@ -42,11 +46,19 @@ class CustomUserManager(BaseUserManager):
 class School(models.Model):
     name = models.CharField(max_length=255, unique=True)
     code = models.CharField(max_length=50, unique=True)
+    database = models.CharField(
+        max_length=100, default='default', editable=False,
+        help_text=_("Database alias holding the school's data (core.shards). Changed by `manage.py move_school`.")
+    )
+    moving_to = models.CharField(
+        max_length=100, blank=True, default='', editable=False,
+        help_text=_("Database the school is being moved to; its data is read-only meanwhile.")
+    )
 
     def __str__(self):
         return self.name
 
-class User(AbstractUser):
+class User(GlobalIdModel, AbstractUser):
     """
     Custom User model for the camp.
     Inherits from AbstractUser to leverage Django's auth system.
@@ -71,4 +83,37 @@ class User(AbstractUser):
     # username, password, is_staff, is_active, date_joined etc. are inherited from AbstractUser
 
     def __str__(self):
-        return self.username
\ No newline at end of file
+        return self.username
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        renamed = update_fields is None or 'full_name' in update_fields
+        if self._state.adding or self.role != self.Role.STUDENT or not renamed:
+            return super().save(*args, **kwargs)
+        # A renamed student may move on the leaderboard: lock it before the row is written.
+        from students.leaderboard import lock
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            lock(self.school_id, using)
+            super().save(*args, **kwargs)
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # The user list: a school's users, newest first.
+            models.Index(fields=['school', '-date_joined'], name='users_user_school_joined_idx'),
+        ]
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def bump_user_school_version(sender, instance, **kwargs):
+    """Invalidates ETags for the school whose users changed."""
+    bump_school(instance.school_id)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """Drops the user from the authentication cache (password, role or activity may have changed)."""
+    from core.authentication import invalidate_user
+    invalidate_user(instance.pk)
@@ -0,0 +1,150 @@
+# users/roster.py
+
+"""
+Bulk import of a school's students from a CSV or JSON roster.
+
+Creating students one at a time hashes each password in turn and fires the
+post_save signals (profile creation, leaderboard placement, version bumps) for
+every row. Instead, an import:
+
+- validates every row without queries, then checks usernames and emails against
+  the database with one query each (per school database, see core.shards);
+- hashes all passwords across the worker pool (core.passwords);
+- bulk_create()s the users and their StudentProfile rows, which sends no signals;
+- ranks the school's leaderboard once, bumps its version once and indexes the
+  new students for search in bulk.
+
+Rows that fail validation are reported by their 1-based row number and skipped;
+the valid rows are imported.
+"""
+
+import csv
+import io
+import json
+
+from django.conf import settings
+from django.db import transaction
+from drf_camel_case.util import underscoreize
+from rest_framework.exceptions import ValidationError
+
+from core import search, shards
+from core.passwords import make_passwords
+from core.versioning import bump_school
+from .models import User
+from .serializers import RosterRowSerializer
+
+ROSTER_FORMATS = ('csv', 'json')
+
+
+def parse_roster(content, format):
+    """
+    Turns the text of a roster into a list of dicts with snake_case keys. CSV needs
+    a header row; JSON is a list of objects or `{"students": [...]}`. Column names
+    may be snake_case or camelCase.
+    """
+    if format not in ROSTER_FORMATS:
+        raise ValidationError({'format': f"Unsupported roster format {format!r}; use one of {', '.join(ROSTER_FORMATS)}."})
+    if isinstance(content, bytes):
+        try:
+            content = content.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            raise ValidationError({'roster': 'The roster must be UTF-8 encoded.'})
+
+    if format == 'csv':
+        reader = csv.DictReader(io.StringIO(content))
+        rows = [
+            {(key or '').strip(): (value or '').strip() for key, value in row.items()}
+            for row in reader
+        ]
+    else:
+        try:
+            rows = json.loads(content)
+        except ValueError:
+            raise ValidationError({'roster': 'The roster is not valid JSON.'})
+        if isinstance(rows, dict):
+            rows = rows.get('students')
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise ValidationError({'roster': 'Expected a list of students.'})
+    return [underscoreize(row) for row in rows]
+
+
+def import_roster(rows, school, dry_run=False):
+    """
+    Creates a student in `school` for every valid row. Returns a report:
+    `{'created': <count>, 'errors': [{'row': <number>, 'errors': {...}}, ...]}`.
+    With `dry_run`, nothing is hashed or written and `created` counts the students
+    that would have been.
+    """
+    if len(rows) > settings.ROSTER_MAX_ROWS:
+        raise ValidationError({'roster': f'A roster may contain at most {settings.ROSTER_MAX_ROWS} students.'})
+
+    errors = {}
+    valid = {}
+    for number, row in enumerate(rows, start=1):
+        serializer = RosterRowSerializer(data=row)
+        if serializer.is_valid():
+            valid[number] = serializer.validated_data
+        else:
+            errors[number] = dict(serializer.errors)
+
+    # Duplicates within the roster, then against existing users with one query per field.
+    for field in ('username', 'email'):
+        seen = {}
+        for number, data in valid.items():
+            value = data.get(field)
+            if value is None:
+                continue
+            if value in seen:
+                errors.setdefault(number, {})[field] = [f'Duplicates row {seen[value]}.']
+            else:
+                seen[value] = number
+        if seen:
+            # Usernames and emails are unique across every school database (core.shards).
+            taken = set()
+            for database in shards.databases():
+                taken.update(User.objects.using(database).filter(**{f'{field}__in': list(seen)}).values_list(field, flat=True))
+            for value, number in seen.items():
+                if value in taken:
+                    errors.setdefault(number, {})[field] = [f'A user with this {field} already exists.']
+
+    accepted = [data for number, data in valid.items() if number not in errors]
+    report = {
+        'created': len(accepted),
+        'errors': [{'row': number, 'errors': errors[number]} for number in sorted(errors)],
+    }
+    if dry_run or not accepted:
+        return report
+
+    passwords = make_passwords(data['password'] for data in accepted)
+    users = [
+        User(
+            username=data['username'],
+            password=password,
+            full_name=data.get('full_name', ''),
+            email=data.get('email'),
+            phone_number=data.get('phone_number', ''),
+            role=User.Role.STUDENT,
+            school=school,
+        )
+        for data, password in zip(accepted, passwords)
+    ]
+
+    from students import leaderboard
+    from students.models import StudentProfile
+    with shards.use_school(school.pk), transaction.atomic(using=shards.database_for_school(school.pk, write=True)):
+        User.objects.bulk_create(users, batch_size=500)
+        if any(user.pk is None for user in users):
+            # Backends that cannot return inserted rows (MySQL) leave the pks unset.
+            ids = dict(User.objects.filter(username__in=[user.username for user in users]).values_list('username', 'pk'))
+            for user in users:
+                user.pk = ids[user.username]
+        StudentProfile.objects.bulk_create(
+            [StudentProfile(user=user, school=school) for user in users],
+            batch_size=500,
+        )
+        # bulk_create() sends no post_save, so do once what the receivers do per row.
+        leaderboard.rebuild(school.pk)
+        bump_school(school.pk)
+        search.index(User, [user.pk for user in users])
+        search.index(StudentProfile, [user.pk for user in users])
+    return report
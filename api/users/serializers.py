@@ -1,8 +1,39 @@
 from rest_framework import serializers
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from django.conf import settings
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.utils import timezone
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from core import shards
+from core.serializers import RowSerializer, format_datetime
+from core.tokens import RotatingRefreshToken
+from . import logins
 from .models import User
 
-class UserSerializer(serializers.ModelSerializer):
+class GloballyUniqueUserMixin:
+    """
+    Checks usernames and emails against every school database (core.shards); the
+    model's unique validators only see the current one.
+    """
+    def _check_unique_everywhere(self, field, value):
+        if not value or not shards.enabled():
+            return value
+        users = User.objects.all()
+        if self.instance is not None:
+            users = users.exclude(pk=self.instance.pk)
+        if shards.exists_anywhere(users, **{field: value}):
+            raise serializers.ValidationError(f'A user with that {field} already exists.')
+        return value
+
+    def validate_username(self, value):
+        return self._check_unique_everywhere('username', value)
+
+    def validate_email(self, value):
+        return self._check_unique_everywhere('email', value)
+
+
+class UserSerializer(GloballyUniqueUserMixin, serializers.ModelSerializer):
     """
     Serializer for reading and updating user information.
     The 'role' is read-only here to prevent users from changing their own role.
@@ -15,8 +46,35 @@ class UserSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['role', 'last_login', 'date_joined']
 
+    def to_representation(self, instance):
+        # Logins are written in batches (users.logins); show one that is still pending.
+        pending = logins.pending_last_logins([instance.pk]).get(instance.pk)
+        if pending is not None and logins.latest(instance.last_login, pending) is pending:
+            instance.last_login = pending
+        return super().to_representation(instance)
+
+
+class UserRowSerializer(RowSerializer):
+    """
+    Read-only, values()-based equivalent of UserSerializer for list responses.
+    """
+    fields = UserSerializer.Meta.fields
+    datetime_fields = ('date_joined',)
+    method_lookups = {'last_login': ('id', 'last_login')}
+
+    def get_last_login(self, row, prefix):
+        # One cache lookup for all the rows (this may be nested, e.g. in student rows).
+        memo = self.context.setdefault('pending_last_logins', {})
+        if prefix not in memo:
+            rows = self.context.get('rows') or [row]
+            memo[prefix] = logins.pending_last_logins([
+                other[f'{prefix}id'] for other in rows if other[f'{prefix}id'] is not None
+            ])
+        value = logins.latest(row[f'{prefix}last_login'], memo[prefix].get(row[f'{prefix}id']))
+        return format_datetime(value)
+
 
-class UserCreateSerializer(serializers.ModelSerializer):
+class UserCreateSerializer(GloballyUniqueUserMixin, serializers.ModelSerializer):
     """
     Serializer for creating new users (students or teachers) by an admin/teacher.
     """
@@ -47,6 +105,23 @@ class UserCreateSerializer(serializers.ModelSerializer):
         return user
 
 
+class RosterRowSerializer(serializers.ModelSerializer):
+    """
+    Validates one student of a roster import (see users.roster) without queries:
+    uniqueness is checked for the whole roster at once.
+    """
+    password = serializers.CharField(write_only=True, required=True)
+    email = serializers.EmailField(required=False, allow_blank=True, allow_null=True)
+
+    class Meta:
+        model = User
+        fields = ['username', 'password', 'full_name', 'email', 'phone_number']
+        extra_kwargs = {'username': {'validators': [UnicodeUsernameValidator()]}}
+
+    def validate_email(self, value):
+        return value or None
+
+
 class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
     """
     Customizes the JWT token payload to include user's role and username.
@@ -58,8 +133,39 @@ class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
         token['username'] = user.username
         token['role'] = user.role
         token['fullName'] = user.full_name
+        token[shards.SCHOOL_CLAIM] = user.school_id
         return token
 
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        if settings.LAST_LOGIN_BUFFERED:
+            logins.record_login(self.user, timezone.now())
+        return data
+
+
+class MyTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Rotates refresh tokens with a fixed handful of queries (see core.tokens):
+    one user lookup, the blacklist insert and the new outstanding token.
+    """
+    token_class = RotatingRefreshToken
+
+    def validate(self, attrs):
+        if not (api_settings.ROTATE_REFRESH_TOKENS and api_settings.BLACKLIST_AFTER_ROTATION):
+            return super().validate(attrs)
+
+        refresh = self.token_class(attrs['refresh'])
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM)
+        shards.activate(refresh.payload.get(shards.SCHOOL_CLAIM))
+        user = shards.find(User.objects.only('pk', 'is_active', 'school_id'), **{api_settings.USER_ID_FIELD: user_id})
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+        shards.activate(user.school_id)
+
+        access = str(refresh.access_token)
+        refresh.rotate(user.pk)
+        return {'access': access, 'refresh': str(refresh)}
+
 
 class ChangePasswordSerializer(serializers.Serializer):
     """
@@ -1,3 +1,112 @@
+from io import StringIO
+from unittest import skipUnless
+
+from django.conf import settings
+from django.core.management import CommandError, call_command
 from django.test import TestCase
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from core import shards
+from store.models import StoreItem, Transaction
+from students import leaderboard
+from students.models import StudentProfile, XpGrantLog
+from users.management.commands.move_school import copy_school
+from .models import School, User
+
+
+@skipUnless('shard1' in settings.DATABASES, 'Set DATABASE_SHARD_URLS to test moving schools between databases.')
+class MoveSchoolTests(TestCase):
+    """`manage.py move_school` copies a school's rows to another database, then removes the originals."""
+    databases = {'default', 'shard1'} if 'shard1' in settings.DATABASES else {'default'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.school = School.objects.create(name='School', code='school')
+        cls.other_school = School.objects.create(name='Other school', code='other')
+        with shards.use_school(cls.school.pk):
+            cls.teacher = User.objects.create(username='teacher', role=User.Role.TEACHER, is_staff=True, school=cls.school)
+            cls.students = [
+                User.objects.create(username=f'student-{n}', full_name=f'Student {n}', school=cls.school)
+                for n in range(3)
+            ]
+            StudentProfile.objects.filter(pk=cls.students[2].pk).update(total_xp=10, available_xp=10)
+            leaderboard.rebuild(cls.school.pk)
+            XpGrantLog.objects.create(student=cls.students[2], teacher=cls.teacher, amount=10, school=cls.school)
+            item = StoreItem.objects.create(name='Sticker', xp_cost=5, stock_quantity=5)
+            Transaction.objects.create(student=cls.students[2], item=item, xp_cost_at_purchase=5, school=cls.school)
+            RefreshToken.for_user(cls.students[0]).blacklist()
+            RefreshToken.for_user(cls.students[1])
+        with shards.use_school(cls.other_school.pk):
+            User.objects.create(username='other-student', school=cls.other_school)
+
+    def setUp(self):
+        shards.schools.clear()
+
+    def move(self, code, database):
+        call_command('move_school', code, database, settle=0, stdout=StringIO())
+        shards.schools.clear()
+
+    def rows(self, database):
+        """The school's rows on `database`, per model."""
+        return {
+            'users': set(User.objects.using(database).filter(school=self.school).values_list('pk', flat=True)),
+            'ranks': dict(StudentProfile.objects.using(database).filter(school=self.school).values_list('pk', 'rank')),
+            'logs': XpGrantLog.objects.using(database).filter(school=self.school).count(),
+            'transactions': Transaction.objects.using(database).filter(school=self.school).count(),
+            'tokens': OutstandingToken.objects.using(database).filter(user__school=self.school).count(),
+            'blacklisted': BlacklistedToken.objects.using(database).filter(token__user__school=self.school).count(),
+        }
+
+    def test_move_and_back(self):
+        before = self.rows('default')
+        self.assertEqual((len(before['users']), before['logs'], before['transactions']), (4, 1, 1))
+        self.assertEqual((before['tokens'], before['blacklisted']), (2, 1))
+
+        self.move('school', 'shard1')
+        school = School.objects.using('default').get(pk=self.school.pk)
+        self.assertEqual((school.database, school.moving_to), ('shard1', ''))
+        self.assertEqual(self.rows('shard1'), before)
+        empty = {'users': set(), 'ranks': {}, 'logs': 0, 'transactions': 0, 'tokens': 0, 'blacklisted': 0}
+        self.assertEqual(self.rows('default'), empty)
+        self.assertTrue(User.objects.using('default').filter(username='other-student').exists())
+
+        self.move('school', 'default')
+        self.assertEqual(School.objects.using('default').get(pk=self.school.pk).database, 'default')
+        self.assertEqual(self.rows('default'), before)
+        self.assertEqual(self.rows('shard1'), empty)
+
+    def test_reads_follow_the_school(self):
+        self.move('school', 'shard1')
+        client = APIClient()
+        # A real token: its school claim routes the request to the school's database.
+        token = AccessToken.for_user(self.teacher)
+        token[shards.SCHOOL_CLAIM] = self.school.pk
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        response = client.get('/api/v1/students/leaderboard/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [item['user']['username'] for item in response.json()['data']['items']],
+            ['student-2', 'student-0', 'student-1'],
+        )
+
+    def test_refused_moves(self):
+        for code, database, message in [
+            ('school', 'default', 'already on default'),
+            ('school', 'shard9', 'Unknown database'),
+            ('nowhere', 'shard1', 'No school'),
+        ]:
+            with self.subTest(code=code, database=database), self.assertRaisesMessage(CommandError, message):
+                self.move(code, database)
+
+    def test_interrupted_move_is_resumed(self):
+        before = self.rows('default')
+        # A move that failed after copying part of the school.
+        School.objects.filter(pk=self.school.pk).update(moving_to='shard1')
+        shards.sync_shared_rows('shard1')
+        copy_school('default', 'shard1', self.school.pk)
 
-# Create your tests here.
+        self.move('school', 'shard1')
+        self.assertEqual(self.rows('shard1'), before)
+        self.assertEqual(School.objects.using('default').get(pk=self.school.pk).moving_to, '')
@@ -1,17 +1,23 @@
 # users/views.py
 
+import os
+
+from django.conf import settings
 from rest_framework import viewsets, status, generics
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.filters import OrderingFilter
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework_simplejwt.views import TokenObtainPairView
 
+from . import roster
 from .models import User
-from .serializers import UserSerializer, UserCreateSerializer, MyTokenObtainPairSerializer, ChangePasswordSerializer
+from .serializers import UserSerializer, UserRowSerializer, UserCreateSerializer, MyTokenObtainPairSerializer, ChangePasswordSerializer
+from core.filters import IndexedSearchFilter
+from core.mixins import ConditionalGetMixin, RowListMixin, SparseFieldsetMixin
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(ConditionalGetMixin, SparseFieldsetMixin, RowListMixin, viewsets.ModelViewSet):
     """
     API endpoint for viewing and editing users.
     - Full CRUD is restricted to Admin users.
@@ -23,8 +29,10 @@ class UserViewSet(viewsets.ModelViewSet):
         if user.is_authenticated and user.school_id:
             qs = qs.filter(school_id=user.school_id)
         return qs
+    row_serializer_class = UserRowSerializer
+    etag_scopes = ['school']
     permission_classes = [IsAdminUser] # Default permission for the ViewSet
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, IndexedSearchFilter, OrderingFilter]
 
     # Server-side filtering, searching, and ordering
     search_fields = ['username', 'email', 'full_name', 'phone_number']
@@ -57,6 +65,33 @@ class UserViewSet(viewsets.ModelViewSet):
         serializer.save()
         return Response(serializer.data)
 
+    @action(detail=False, methods=['post'], url_path='import')
+    def import_roster(self, request):
+        """
+        Creates many students in the caller's school at once (see users.roster).
+        Accepts a `roster` file (.csv or .json) or a JSON list of students as the body.
+        With `?dryRun=true` the roster is only validated.
+        """
+        school = request.user.school if request.user.school_id else None
+        if school is None:
+            return Response({'error': 'You must belong to a school to import students.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        upload = request.FILES.get('roster')
+        if upload is not None:
+            if upload.size > settings.ROSTER_MAX_UPLOAD_BYTES:
+                return Response({'error': 'The roster file is too large.'}, status=status.HTTP_400_BAD_REQUEST)
+            extension = os.path.splitext(upload.name)[1].lstrip('.').lower()
+            rows = roster.parse_roster(upload.read(), extension)
+        else:
+            rows = request.data.get('students') if isinstance(request.data, dict) else request.data
+            if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+                return Response({'error': 'Provide a roster file or a list of students.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        dry_run = request.query_params.get('dryRun', '').lower() in ('1', 'true')
+        report = roster.import_roster(rows, school, dry_run=dry_run)
+        created = report['created'] and not dry_run
+        return Response(report, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
     @action(detail=False, methods=['get'], url_path='my-school', permission_classes=[IsAuthenticated])
     def my_school(self, request):
         user = request.user